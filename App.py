@@ -4,6 +4,7 @@ from pathlib import Path
 
 # 1) IMPORTAR LA FUNCIÓN DE AUTH
 from auth import check_password
+from data import warm_up
 
 def get_project_root() -> Path:
     """Returns the project root folder."""
@@ -26,6 +27,9 @@ st.set_page_config(
 if not check_password():
     st.stop()
 
+# 3) PRECARGA DE LOS DATOS EN SEGUNDO PLANO (mientras se lee la portada)
+warm_up()
+
 # Crear tres columnas y mostrar la imagen en la columna central
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
@@ -53,6 +57,9 @@ Elije el modelo de consulta que necesitas:
 - **Rotacion**: Te mostrará el listado de cilindros que no han retornado en 30 dias.
 - **Cilindros por ubicacion**: Te permitirá conocer los cilindros disponibles en local o clientes
 - **Cilindros por fecha**: Te permitirá conocer el detalle de todos los movimientos durante un periodo determinado.
+- **Tiempos de ciclo**: Te mostrará cuántos días tardan los cilindros en retornar (mediana y p90) por cliente, servicio y mes.
+- **Resumen de flota**: Te mostrará cuántos cilindros hay en cada cliente, ubicación y servicio, y los movimientos por día.
+- **Anomalías**: Te mostrará los movimientos a revisar en la planilla (salidas sin retorno, DETALLE sin PROCESO, fechas inválidas).
 
 :moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag:
     """
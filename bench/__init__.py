@@ -0,0 +1,13 @@
+# bench
+"""
+Benchmarks de la aplicación, sin conexión a Google Sheets.
+
+- `flota.py`: generador de registros PROCESO/DETALLE sintéticos.
+- `gspread_local.py`: reemplazo en memoria del cliente/worksheet de gspread.
+- `run.py`: mide carga, normalización, unión y las consultas de cada página a
+  varias escalas y guarda los resultados para comparar entre versiones.
+
+Uso (desde la raíz del repositorio):
+
+    python -m bench.run --escalas 10000 100000 1000000
+"""
@@ -0,0 +1,113 @@
+# bench/flota.py
+"""
+Generador de una flota sintética de cilindros.
+
+Cada cliente recibe un camión desde su planta cada `periodo` días. En cada
+visita se despachan y entregan cilindros llenos y se retiran los vacíos, que
+vuelven a la planta (DESPACHO -> ENTREGA -> RETIRO -> RECEPCION). Cada visita
+genera un PROCESO por tipo de movimiento, con una fila de DETALLE por cilindro,
+igual que en la planilla real.
+
+Los cilindros se simulan por rondas (un ciclo por ronda, vectorizado sobre toda
+la flota), así generar millones de movimientos toma segundos. Los eventos de
+cada cilindro quedan en orden cronológico estricto y los ciclos que terminarían
+después de `hasta` quedan abiertos (cilindros todavía en clientes).
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PROCESOS = np.array(["DESPACHO", "ENTREGA", "RETIRO", "RECEPCION"])
+PLANTAS = np.array(["PLANTA SANTIAGO", "PLANTA CONCEPCION", "PLANTA ANTOFAGASTA", "BODEGA CENTRAL"])
+SERVICIOS = np.array(["OXIGENO", "ARGON", "NITROGENO", "CO2", "ACETILENO", "HELIO", "MEZCLA"])
+
+ENCABEZADO_PROCESO = ["IDPROC", "FECHA", "HORA", "PROCESO", "CLIENTE", "UBICACION"]
+ENCABEZADO_DETALLE = ["IDPROC", "SERIE", "SERVICIO"]
+
+# Ciclos promedio por cilindro en el período generado
+CICLOS_POR_CILINDRO = 20
+
+
+def generar(n_movimientos: int, n_cilindros: int | None = None, n_clientes: int = 200,
+            dias: int = 3 * 365, hasta: datetime | None = None,
+            seed: int = 0) -> dict[str, list[list[str]]]:
+    """
+    Genera aproximadamente `n_movimientos` filas de DETALLE y sus PROCESOs.
+    Retorna `{"PROCESO": grilla, "DETALLE": grilla}`: listas de filas de texto
+    con encabezado, tal como las entrega la API de Google Sheets.
+    """
+    rng = np.random.default_rng(seed)
+    hasta = pd.Timestamp(hasta or datetime.now()).floor("s")
+    desde = hasta - pd.Timedelta(days=dias)
+    total_h = dias * 24.0
+
+    n_cilindros = n_cilindros or max(n_movimientos // (4 * CICLOS_POR_CILINDRO), 10)
+    ciclo_h = total_h / CICLOS_POR_CILINDRO
+
+    # Clientes: popularidad tipo Zipf, planta, frecuencia y hora de visita
+    peso = 1.0 / np.arange(1, n_clientes + 1) ** 0.8
+    peso /= peso.sum()
+    planta = rng.integers(len(PLANTAS), size=n_clientes)
+    periodo = 24.0 * rng.choice([1, 2, 3, 7, 14], size=n_clientes)
+    fase = rng.uniform(0, periodo) // 24 * 24 + rng.uniform(7, 18, size=n_clientes)
+    viaje = rng.uniform(1, 8, size=n_clientes)
+
+    # Rondas: cada cilindro disponible hace un ciclo completo con un cliente
+    listo = rng.uniform(0, ciclo_h, size=n_cilindros)
+    partes = []
+    activos = np.flatnonzero(listo <= total_h)
+    while len(activos):
+        c = rng.choice(n_clientes, size=len(activos), p=peso)
+        per, fa, vi = periodo[c], fase[c], viaje[c]
+        v_desp = np.maximum(np.ceil((listo[activos] - fa) / per), 0)
+        estadia = rng.gamma(2.0, 0.3 * ciclo_h, size=len(activos))
+        v_ret = np.maximum(np.ceil((v_desp * per + vi + estadia) / per), v_desp + 1)
+        t_desp = v_desp * per + fa
+        t_ret = v_ret * per + fa + vi + 0.5
+        horas = np.stack([t_desp, t_desp + vi, t_ret, t_ret + vi], axis=1)
+        visita = np.stack([v_desp, v_desp, v_ret, v_ret], axis=1)
+        partes.append(pd.DataFrame({
+            "CILINDRO": np.repeat(activos, 4),
+            "TIPO": np.tile(np.arange(4), len(activos)),
+            "CLIENTE": np.repeat(c, 4),
+            "VISITA": visita.ravel().astype(np.int64),
+            "HORAS": horas.ravel(),
+        }))
+        listo[activos] = t_ret + vi + rng.gamma(2.0, 0.1 * ciclo_h, size=len(activos))
+        activos = activos[listo[activos] <= total_h]
+    ev = pd.concat(partes, ignore_index=True)
+    ev = ev[ev["HORAS"] <= total_h]
+
+    # Un PROCESO por (visita, cliente, tipo), numerados en orden cronológico
+    grupo = ev.groupby(["VISITA", "CLIENTE", "TIPO"], sort=True)
+    procesos = grupo["HORAS"].min().reset_index()
+    orden = np.argsort(procesos["HORAS"].to_numpy(), kind="stable")
+    procesos = procesos.iloc[orden].reset_index(drop=True)
+    idproc = np.empty(len(orden), dtype=np.int64)
+    idproc[orden] = np.arange(1, len(orden) + 1)
+    ev["IDPROC"] = idproc[grupo.ngroup().to_numpy()]
+    ev = ev.sort_values(["IDPROC", "CILINDRO"], kind="stable")
+
+    nombres = np.array([f"CLIENTE {i + 1:03d}" for i in range(n_clientes)])
+    c = procesos["CLIENTE"].to_numpy()
+    ubicacion = np.where(procesos["TIPO"] < 2, nombres[c], PLANTAS[planta[c]])
+    ts = desde + pd.to_timedelta((procesos["HORAS"] * 3600).round(), unit="s")
+    proceso = [ENCABEZADO_PROCESO] + [list(fila) for fila in zip(
+        map(str, range(1, len(procesos) + 1)),
+        ts.dt.strftime("%d/%m/%Y"),
+        ts.dt.strftime("%H:%M:%S"),
+        PROCESOS[procesos["TIPO"].to_numpy()].tolist(),
+        nombres[c].tolist(),
+        ubicacion.tolist(),
+    )]
+
+    # SERIE con separador de miles, como la muestra la planilla
+    numeros = rng.choice(10 * n_cilindros, size=n_cilindros, replace=False) + 100_000
+    series = np.array([f"{n:,}" for n in numeros], dtype=object)
+    servicio = SERVICIOS.astype(object)[rng.integers(len(SERVICIOS), size=n_cilindros)]
+    cil = ev["CILINDRO"].to_numpy()
+    detalle = [ENCABEZADO_DETALLE] + [list(fila) for fila in zip(
+        map(str, ev["IDPROC"].tolist()), series[cil].tolist(), servicio[cil].tolist(),
+    )]
+    return {"PROCESO": proceso, "DETALLE": detalle}
@@ -0,0 +1,132 @@
+# bench/gspread_local.py
+"""
+Reemplazo en memoria del cliente de gspread, para medir y probar sin red.
+
+Implementa sólo lo que usa la aplicación: `Client.open`,
+`Spreadsheet.worksheet` / `values_batch_get` / `get_lastUpdateTime` y los
+métodos de lectura de `Worksheet`. Los valores se guardan como una grilla de
+texto (lo mismo que entrega la API) y se cuenta cada llamada en `requests`, de
+modo que se puede verificar cuántas peticiones hace una sincronización.
+`latencia` simula el tiempo de ida y vuelta de cada petición.
+
+Las escrituras (`append_rows`, `update`) avanzan `lastUpdateTime`, igual que
+la fecha de modificación de Drive; quien modifique `values` directamente
+debe llamar a `Spreadsheet.tocar()`.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol, to_records
+
+
+class Worksheet:
+    def __init__(self, spreadsheet: "Spreadsheet", title: str, values: list[list[str]]):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.values = values
+
+    @property
+    def row_count(self) -> int:
+        return len(self.values)
+
+    @property
+    def col_count(self) -> int:
+        return max((len(r) for r in self.values), default=0)
+
+    def _grid(self, range_name: str | None = None) -> list[list[str]]:
+        if not range_name:
+            return [list(r) for r in self.values]
+        grid = a1_range_to_grid_range(range_name)
+        r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(self.values))
+        c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+        return [list(r[c0:c1]) for r in self.values[r0:r1]]
+
+    def get_values(self, range_name: str | None = None, **kwargs) -> list[list[str]]:
+        self.spreadsheet._request()
+        return self._grid(range_name)
+
+    get = get_values
+
+    def get_all_values(self, **kwargs) -> list[list[str]]:
+        return self.get_values()
+
+    def get_all_records(self, **kwargs) -> list[dict]:
+        values = self.get_values()
+        return to_records(values[0], values[1:]) if values else []
+
+    def append_rows(self, rows: list[list], **kwargs) -> None:
+        self.spreadsheet._request()
+        self.values.extend([str(v) for v in r] for r in rows)
+        self.spreadsheet.tocar()
+
+    def update(self, values: list[list], range_name: str = "A1", **kwargs) -> None:
+        """Escribe `values` desde la celda de inicio de `range_name`."""
+        self.spreadsheet._request()
+        fila, col = a1_to_rowcol(range_name.split(":")[0])
+        for i, valores in enumerate(values, start=fila - 1):
+            while len(self.values) <= i:
+                self.values.append([])
+            row = self.values[i]
+            row.extend([""] * (col - 1 + len(valores) - len(row)))
+            row[col - 1:col - 1 + len(valores)] = [str(v) for v in valores]
+        self.spreadsheet.tocar()
+
+
+class Spreadsheet:
+    def __init__(self, sheets: dict[str, list[list[str]]], title: str = "LOCAL",
+                 latencia: float = 0.0):
+        self.title = title
+        self.latencia = latencia
+        self.requests = 0
+        self._modificado = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self._sheets = {name: Worksheet(self, name, values) for name, values in sheets.items()}
+
+    def _request(self) -> None:
+        self.requests += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    @property
+    def lastUpdateTime(self) -> str:
+        return self._modificado.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    def tocar(self) -> None:
+        """Registra una modificación (avanza `lastUpdateTime`)."""
+        self._modificado = max(self._modificado + timedelta(milliseconds=1), datetime.now(timezone.utc))
+
+    def get_lastUpdateTime(self) -> str:
+        """Fecha de modificación (en gspread, una petición a la API de Drive)."""
+        self._request()
+        return self.lastUpdateTime
+
+    def worksheet(self, title: str) -> Worksheet:
+        try:
+            return self._sheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title) from None
+
+    def worksheets(self) -> list[Worksheet]:
+        return list(self._sheets.values())
+
+    def values_batch_get(self, ranges: list[str], params: dict | None = None) -> dict:
+        """Varias hojas/rangos en una sola petición (`values:batchGet`)."""
+        self._request()
+        value_ranges = []
+        for rango in ranges:
+            title, _, a1 = rango.rpartition("!") if "!" in rango else (rango, "", "")
+            title = title.strip("'").replace("''", "'")
+            values = self.worksheet(title)._grid(a1 or None)
+            value_ranges.append({"range": rango, "values": values} if values else {"range": rango})
+        return {"spreadsheetId": self.title, "valueRanges": value_ranges}
+
+
+class Client:
+    def __init__(self, *spreadsheets: Spreadsheet):
+        self._spreadsheets = {s.title: s for s in spreadsheets}
+
+    def open(self, title: str) -> Spreadsheet:
+        try:
+            return self._spreadsheets[title]
+        except KeyError:
+            raise SpreadsheetNotFound(title) from None
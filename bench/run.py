@@ -0,0 +1,220 @@
+# bench/run.py
+"""
+Benchmark de carga y consultas a varias escalas, sin conexión a Google Sheets.
+
+Para cada escala (cantidad de movimientos) se genera una flota sintética
+(`flota.py`), se sirve con el reemplazo local de gspread (`gspread_local.py`)
+y se mide cada etapa por separado:
+
+- fetch, parse, normalize, merge y carga de la base embebida;
+- sincronización completa, sin cambios (sólo la sonda) e incremental de punta
+  a punta (`SyncEngine`);
+- construcción de índices y consultas de cada página.
+
+Los resultados se agregan a un archivo JSON Lines (una fila por etapa y
+escala) y se comparan con la corrida anterior: una etapa que tarda más de
+`--umbral` veces lo que tardó antes se marca como regresión.
+
+    python -m bench.run --escalas 10000 100000 1000000
+    python -m bench.run --escalas 10000 --estricto   # sale con error si hay regresiones
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from gspread.utils import absolute_range_name
+
+import db
+import schema
+from bench import flota
+from bench.gspread_local import Spreadsheet
+from rotacion import no_retornados, resumen_por_cliente
+from sync import SyncEngine, _clean_rows, read_grid
+
+ESCALAS = (10_000, 100_000, 1_000_000)
+RESULTADOS = Path(__file__).parent / "resultados.jsonl"
+# Filas nuevas por sincronización incremental (fracción de la escala)
+FRACCION_INCREMENTAL = 0.001
+# Etapas más rápidas que esto no se marcan como regresión (ruido de medición)
+MINIMO_SEGUNDOS = 0.01
+
+
+def _medir(fn, repeticiones: int = 1):
+    """Mejor tiempo (segundos) de `repeticiones` llamadas y el último resultado."""
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, resultado
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _agregar_filas(ss: Spreadsheet, n: int) -> None:
+    """Agrega `n` filas de DETALLE (y sus PROCESOs) copiando las últimas con IDPROC nuevos."""
+    proceso, detalle = ss.worksheet("PROCESO").values, ss.worksheet("DETALLE").values
+    siguiente = int(proceso[-1][0]) + 1
+    ahora = datetime.now()
+    nuevos = {}
+    for fila in detalle[-n:]:
+        idproc = nuevos.setdefault(fila[0], str(siguiente + len(nuevos)))
+        detalle.append([idproc] + fila[1:])
+    por_id = {f[0]: f for f in proceso[-len(nuevos) * 2:]}
+    for viejo, nuevo in nuevos.items():
+        base = por_id.get(viejo, proceso[-1])
+        proceso.append([nuevo, ahora.strftime("%d/%m/%Y"), ahora.strftime("%H:%M:%S")] + base[3:])
+    ss.tocar()
+
+
+def medir_escala(n_movimientos: int, repeticiones: int = 3) -> list[dict]:
+    """Mide todas las etapas para una flota de ~`n_movimientos` filas de DETALLE."""
+    resultados = []
+
+    def registrar(etapa: str, segundos: float, filas: int) -> None:
+        resultados.append({"escala": n_movimientos, "etapa": etapa,
+                           "segundos": round(segundos, 6), "filas": int(filas)})
+        print(f"  {etapa:<22} {segundos * 1000:>10.1f} ms  {filas:>10,} filas", flush=True)
+
+    t, hojas = _medir(lambda: flota.generar(n_movimientos))
+    n_det = len(hojas["DETALLE"]) - 1
+    print(f"escala {n_movimientos:,}: {len(hojas['PROCESO']) - 1:,} PROCESO, {n_det:,} DETALLE "
+          f"(generado en {t:.1f} s)", flush=True)
+    ss = Spreadsheet(hojas)
+
+    # --- Etapas de la carga, por separado ---
+    rangos = [absolute_range_name("PROCESO"), absolute_range_name("DETALLE")]
+    t, respuesta = _medir(lambda: ss.values_batch_get(rangos))
+    registrar("fetch", t, n_det)
+    grillas = [vr.get("values", []) for vr in respuesta["valueRanges"]]
+
+    def parse():
+        crudos = []
+        for values in grillas:
+            header = schema.normalizar_encabezado(values[0])
+            crudos.append(read_grid(_clean_rows(values[1:], len(header)), header))
+        return crudos
+
+    t, crudos = _medir(parse)
+    registrar("parse", t, n_det)
+    t, (proc, det) = _medir(lambda: [schema.normalizar(df) for df in crudos])
+    registrar("normalize", t, n_det)
+
+    engine = SyncEngine(ss)
+    t, unido = _medir(lambda: engine._unir(proc, det))
+    registrar("merge", t, len(unido.movimientos))
+    t, _ = _medir(lambda: engine.db.load(unido.proceso, unido.detalle))
+    registrar("db_load", t, n_det)
+
+    # --- Sincronización de punta a punta ---
+    engine = SyncEngine(ss)
+    t, _ = _medir(engine.sync)
+    registrar("sync_completa", t, len(engine.movimientos))
+    t, _ = _medir(engine.sync, repeticiones)
+    registrar("sync_sin_cambios", t, 0)
+    n_nuevas = max(int(n_movimientos * FRACCION_INCREMENTAL), 1)
+    _agregar_filas(ss, n_nuevas)
+    t, _ = _medir(engine.sync)
+    registrar("sync_incremental", t, n_nuevas)
+
+    # --- Estructuras derivadas ---
+    t, indice = _medir(lambda: engine.indice)
+    registrar("indice", t, len(indice))
+    t, fechas = _medir(lambda: engine.fechas)
+    registrar("indice_fechas", t, len(fechas))
+    t, entregas = _medir(lambda: engine.entregas)
+    registrar("entregas", t, len(entregas))
+
+    # --- Consultas de las páginas (mejor de `repeticiones`) ---
+    rng = np.random.default_rng(0)
+    series = rng.choice(indice.keys, size=min(50, len(indice.keys)), replace=False)
+    t, _ = _medir(lambda: [indice.historial(s) for s in series], repeticiones)
+    registrar("p1_historial", t / len(series), len(series))
+    t, _ = _medir(lambda: [indice.prefix(s[:3]) for s in series], repeticiones)
+    registrar("p1_prefijo", t / len(series), len(series))
+
+    cliente = engine.movimientos["CLIENTE"].value_counts().index[0]
+    t, df = _medir(lambda: db.cilindros_en_cliente(engine.db, cliente), repeticiones)
+    registrar("p2_cliente", t, len(df))
+
+    t, df = _medir(lambda: resumen_por_cliente(no_retornados(entregas)), repeticiones)
+    registrar("p3_rotacion", t, len(df))
+
+    ubicacion = engine.movimientos["UBICACION"].value_counts().index[0]
+    t, df = _medir(lambda: db.ultimo_movimiento_por_ubicacion(engine.db, ubicacion), repeticiones)
+    registrar("p4_ubicacion", t, len(df))
+
+    hasta = datetime.now()
+    t, df = _medir(lambda: fechas.rango(hasta - timedelta(days=30), hasta), repeticiones)
+    registrar("p5_rango_30d", t, len(df))
+    return resultados
+
+
+# ------------------------------------------------------------------
+# Registro y comparación
+# ------------------------------------------------------------------
+def cargar(path: Path) -> pd.DataFrame:
+    if not path.exists():
+        return pd.DataFrame(columns=["corrida", "escala", "etapa", "segundos"])
+    return pd.read_json(path, lines=True)
+
+
+def comparar(actual: pd.DataFrame, historia: pd.DataFrame, umbral: float) -> pd.DataFrame:
+    """Cada etapa contra la última corrida anterior con la misma escala y etapa."""
+    previo = historia.sort_values("corrida").drop_duplicates(["escala", "etapa"], keep="last")
+    df = actual.merge(
+        previo[["escala", "etapa", "segundos"]], on=["escala", "etapa"], how="left",
+        suffixes=("", "_previo"),
+    )
+    df["razon"] = df["segundos"] / df["segundos_previo"]
+    df["regresion"] = (df["razon"] > umbral) & (df["segundos"] >= MINIMO_SEGUNDOS)
+    return df
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", type=Path, default=RESULTADOS)
+    parser.add_argument("--umbral", type=float, default=1.3,
+                        help="razón contra la corrida anterior que cuenta como regresión")
+    parser.add_argument("--estricto", action="store_true", help="salir con código 1 si hay regresiones")
+    args = parser.parse_args(argv)
+
+    corrida = {"corrida": datetime.now().isoformat(timespec="seconds"), "commit": _commit()}
+    filas = []
+    for escala in args.escalas:
+        filas += [{**corrida, **r} for r in medir_escala(escala, args.repeticiones)]
+    actual = pd.DataFrame(filas)
+
+    resultado = comparar(actual, cargar(args.salida), args.umbral)
+    print()
+    print(resultado[["escala", "etapa", "segundos", "segundos_previo", "razon", "regresion"]]
+          .to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+    args.salida.parent.mkdir(parents=True, exist_ok=True)
+    with args.salida.open("a", encoding="utf-8") as f:
+        f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in filas)
+
+    regresiones = resultado[resultado["regresion"]]
+    if len(regresiones):
+        print(f"\n{len(regresiones)} etapa(s) más lentas que {args.umbral}x la corrida anterior.")
+    return 1 if args.estricto and len(regresiones) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# consultas.py
+"""
+Consultas de negocio, independientes de Streamlit.
+
+Cada función recibe el motor de datos (`SyncEngine`: el compartido por la app,
+o uno abierto sobre la copia en disco con `abrir_copia_local`; o un
+`snapshot.SnapshotEngine` en modo multi-proceso) y los
+parámetros de la consulta, y retorna un DataFrame listo para mostrar o
+exportar. Las páginas y el CLI de reportes (`reportes.py`) usan estas mismas
+funciones, así que un reporte por lotes entrega exactamente lo que se ve en
+pantalla.
+
+Los resultados se memoizan por (versión de los datos, consulta, parámetros)
+(ver `MovementData.memo` en `sync.py`): volver a un cliente o ubicación ya consultado, o
+repetir una consulta en otra sesión, no recalcula nada mientras los datos no
+cambien. Los DataFrames retornados son compartidos y no deben modificarse.
+"""
+import csv
+import re
+from datetime import date, datetime, time
+from functools import wraps
+from pathlib import Path
+
+import pandas as pd
+
+import db
+from db import ENTREGAS
+from rotacion import TRAMOS, no_retornados, resumen_ciclos, resumen_por_cliente
+from sync import CACHE_DIR, SyncEngine
+from schema import con_fecha_y_hora
+from tiempos import medido
+
+# Columnas de cada listado, en el orden en que se muestran
+CLIENTE_COLS = ["SERIE", "IDPROC", "FECHA", "HORA", "PROCESO", "SERVICIO"]
+UBICACION_COLS = ["SERIE", "IDPROC", "FECHA", "PROCESO", "CLIENTE", "SERVICIO", "UBICACION"]
+FECHA_COLS = ["FECHA", "HORA", "IDPROC", "PROCESO", "CLIENTE", "UBICACION", "SERIE", "SERVICIO"]
+RESUMEN_CILINDRO_COLS = [
+    "SERIE", "MOVIMIENTOS", "FECHA", "HORA", "PROCESO", "CLIENTE", "UBICACION", "SERVICIO",
+]
+
+
+def abrir_copia_local(cache_dir: Path = CACHE_DIR) -> SyncEngine:
+    """Motor sobre la última copia sincronizada en disco, sin conectarse a Google Sheets."""
+    engine = SyncEngine.offline(cache_dir)
+    if engine.movimientos.empty:
+        raise FileNotFoundError(f"No hay una copia local de los datos en {cache_dir}")
+    return engine
+
+
+def _columnas(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    return df[[c for c in cols if c in df.columns]]
+
+
+def _hashable(valor):
+    if isinstance(valor, (list, tuple)):
+        return tuple(_hashable(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in valor.items()))
+    return valor
+
+
+def memoizada(fn):
+    """Memoiza `fn(engine, ...)` por versión de los datos y parámetros."""
+    @wraps(fn)
+    def envoltura(engine: SyncEngine, *args, **kwargs):
+        clave = (fn.__name__, _hashable(args), _hashable(kwargs))
+        return engine.memo(clave, lambda: fn(engine, *args, **kwargs))
+    return envoltura
+
+
+# ------------------------------------------------------------------
+# Cilindros
+# ------------------------------------------------------------------
+def normalizar_serie(texto: str) -> str:
+    """SERIE tal como se guarda (sin separadores de miles ni espacios)."""
+    return str(texto).replace(",", "").strip()
+
+
+@medido("query")
+def buscar_cilindro(engine: SyncEngine, texto: str, limit: int = 50) -> tuple[str | None, list[str]]:
+    """
+    Retorna `(serie, coincidencias)`: la serie si existe exactamente y, si no,
+    las series que comienzan con el texto ingresado.
+    """
+    serie = normalizar_serie(texto)
+    if serie in engine.indice:
+        return serie, []
+    return None, engine.indice.prefix(serie, limit=limit)
+
+
+@medido("query")
+@memoizada
+def historial_cilindro(engine: SyncEngine, serie: str) -> pd.DataFrame:
+    """Movimientos de un cilindro en orden cronológico."""
+    return engine.indice.historial(normalizar_serie(serie))
+
+
+def leer_series(texto: str) -> list[str]:
+    """
+    Series desde un texto pegado (una por línea, o separadas por espacios, tabs
+    o punto y coma), normalizadas y sin repetir. La coma no separa porque es el
+    separador de miles con que la planilla muestra la SERIE.
+    """
+    series = (normalizar_serie(s) for s in re.split(r"[\s;]+", texto))
+    return list(dict.fromkeys(s for s in series if s))
+
+
+def leer_series_csv(texto: str) -> list[str]:
+    """
+    Series desde el contenido de un CSV. Si el encabezado tiene una columna
+    SERIE se usa esa columna; si no, el archivo se lee como una lista (una
+    serie por línea), igual que `leer_series`.
+    """
+    texto = texto.lstrip("\ufeff")
+    lineas = texto.splitlines()
+    if not lineas or "SERIE" not in lineas[0].upper():
+        return leer_series(texto)
+    separador = max(";\t,", key=lineas[0].count)
+    filas = csv.reader(lineas, delimiter=separador)
+    encabezado = [c.strip().upper() for c in next(filas)]
+    col = encabezado.index("SERIE") if "SERIE" in encabezado else 0
+    series = (normalizar_serie(f[col]) for f in filas if len(f) > col)
+    return list(dict.fromkeys(s for s in series if s))
+
+
+@medido("query")
+@memoizada
+def historial_cilindros(engine: SyncEngine, series: list[str]) -> tuple[pd.DataFrame, pd.DataFrame, list[str]]:
+    """
+    Búsqueda masiva: retorna `(historial, resumen, no_encontrados)`.
+
+    - `historial`: movimientos de todas las series encontradas, por SERIE y en
+      orden cronológico (una sola pasada sobre el índice).
+    - `resumen`: una fila por serie encontrada con su cantidad de movimientos y
+      su último movimiento.
+    - `no_encontrados`: series que no aparecen en DETALLE.
+    """
+    indice = engine.indice
+    series = list(dict.fromkeys(normalizar_serie(s) for s in series))
+    encontradas = [s for s in series if s in indice]
+    no_encontrados = [s for s in series if s not in indice]
+
+    historial = indice.historiales(encontradas)
+    conteo = historial.groupby("SERIE", observed=True, sort=False).size()
+    ultimos = historial.dropna(subset=["FECHA_HORA"]).groupby("SERIE", observed=True, sort=False).tail(1)
+    resumen = (
+        pd.DataFrame({"SERIE": pd.Series(encontradas, dtype=str)})
+        .merge(ultimos.astype({"SERIE": str}), on="SERIE", how="left")
+        .assign(MOVIMIENTOS=lambda df: df["SERIE"].map(conteo).fillna(0).astype(int))
+    )
+    historial = historial.drop(columns="FECHA_HORA")
+    return historial, _columnas(resumen, RESUMEN_CILINDRO_COLS), no_encontrados
+
+
+# ------------------------------------------------------------------
+# Clientes y ubicaciones (estado actual o a una fecha)
+# ------------------------------------------------------------------
+@medido("query")
+@memoizada
+def clientes(engine: SyncEngine) -> list[str]:
+    return db.clientes(engine.db)
+
+
+@medido("query")
+@memoizada
+def ubicaciones(engine: SyncEngine) -> list[str]:
+    return db.ubicaciones(engine.db)
+
+
+@medido("query")
+@memoizada
+def cilindros_en_cliente(engine: SyncEngine, cliente: str, al: date | None = None) -> pd.DataFrame:
+    """
+    Cilindros cuyo último movimiento es DESPACHO o ENTREGA al cliente: hoy o,
+    con `al`, al final de ese día.
+    """
+    if al is None:
+        return _columnas(db.cilindros_en_cliente(engine.db, cliente), CLIENTE_COLS)
+    estado = estado_al(engine, al)
+    df = estado[(estado["CLIENTE"] == cliente) & estado["PROCESO"].isin(ENTREGAS)]
+    return _columnas(con_fecha_y_hora(df), CLIENTE_COLS)
+
+
+@medido("query")
+@memoizada
+def cilindros_en_ubicacion(engine: SyncEngine, ubicacion: str, al: date | None = None) -> pd.DataFrame:
+    """
+    Último movimiento de los cilindros que están en la ubicación: hoy o, con
+    `al`, al final de ese día.
+    """
+    if al is None:
+        return _columnas(db.ultimo_movimiento_por_ubicacion(engine.db, ubicacion), UBICACION_COLS)
+    estado = estado_al(engine, al)
+    df = estado[estado["UBICACION"] == ubicacion]
+    return _columnas(con_fecha_y_hora(df), UBICACION_COLS)
+
+
+@memoizada
+def estado_al(engine: SyncEngine, al: date) -> pd.DataFrame:
+    """Último movimiento de cada SERIE al final del día `al` (ver `historico.py`)."""
+    return engine.historico.al(datetime.combine(al, time.max))
+
+
+# ------------------------------------------------------------------
+# Rotación
+# ------------------------------------------------------------------
+def leer_tramos(texto: str) -> list[int]:
+    """
+    Tramos de antigüedad desde un texto como "30, 60, 90"; vacío = tramos por
+    defecto. Lanza `ValueError` si algún valor no es un entero.
+    """
+    return sorted({int(t) for t in texto.split(",") if t.strip()}) or list(TRAMOS)
+
+
+@medido("query")
+def rotacion(engine: SyncEngine, umbral: int = 30, tramos=TRAMOS,
+             hoy: datetime | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Cilindros entregados hace `umbral` días o más y no retornados, y su
+    resumen por cliente y tramo de antigüedad.
+    """
+    # "Ahora" al minuto, para que el resultado se pueda reutilizar entre reruns
+    hoy = hoy or datetime.now().replace(second=0, microsecond=0)
+    return _rotacion(engine, int(umbral), tuple(sorted(set(tramos))), hoy)
+
+
+@memoizada
+def _rotacion(engine: SyncEngine, umbral: int, tramos: tuple, hoy: datetime):
+    detalle = no_retornados(engine.entregas, umbral=umbral, tramos=tramos, hoy=hoy)
+    return detalle, resumen_por_cliente(detalle)
+
+
+# ------------------------------------------------------------------
+# Movimientos por fecha
+# ------------------------------------------------------------------
+@medido("query")
+@memoizada
+def movimientos_por_fecha(engine: SyncEngine, desde: datetime, hasta: datetime) -> pd.DataFrame:
+    """Movimientos entre `desde` y `hasta` (inclusive), con SERIE y SERVICIO."""
+    return _columnas(engine.fechas.rango(desde, hasta), FECHA_COLS)
+
+
+# ------------------------------------------------------------------
+# Resumen de la flota (tablas de resumen de `db.py`)
+# ------------------------------------------------------------------
+@medido("query")
+@memoizada
+def resumen_flota(engine: SyncEngine, dimension: str) -> pd.DataFrame:
+    """Cilindros por CLIENTE (entregados), UBICACION o SERVICIO según el estado actual."""
+    return db.resumen_estado(engine.db, dimension)
+
+
+@medido("query")
+@memoizada
+def movimientos_por_dia(engine: SyncEngine, desde: date) -> pd.DataFrame:
+    """Movimientos por día (filas) y PROCESO (columnas) desde `desde`."""
+    df = db.movimientos_por_dia(engine.db, desde.isoformat())
+    return df.pivot_table(index="FECHA", columns="PROCESO", values="MOVIMIENTOS", fill_value=0)
+
+
+# ------------------------------------------------------------------
+# Anomalías (ver `validacion.py`)
+# ------------------------------------------------------------------
+@medido("query")
+@memoizada
+def anomalias(engine: SyncEngine, tipos: tuple = ()) -> pd.DataFrame:
+    """Anomalías detectadas en los datos, sólo de los `tipos` dados (vacío = todas)."""
+    df = engine.anomalias
+    return df[df["TIPO"].isin(tipos)] if tipos else df
+
+
+# ------------------------------------------------------------------
+# Tiempos de ciclo
+# ------------------------------------------------------------------
+@medido("query")
+@memoizada
+def ciclos(engine: SyncEngine, por=("CLIENTE",), desde: date | None = None,
+           hasta: date | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Viajes con salida entre `desde` y `hasta` (inclusive; sin límite si se
+    omiten) y su resumen por las columnas `por` (ver `rotacion.resumen_ciclos`).
+    """
+    df = engine.viajes
+    if desde is not None:
+        df = df[df["SALIDA"] >= pd.Timestamp(desde)]
+    if hasta is not None:
+        df = df[df["SALIDA"] <= datetime.combine(hasta, time.max)]
+    return df, resumen_ciclos(df, por)
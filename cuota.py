@@ -0,0 +1,131 @@
+# cuota.py
+"""
+Planificador de peticiones a Google Sheets dentro de la cuota de la API.
+
+La API de Sheets limita las lecturas por minuto de la cuenta de servicio; al
+pasarse responde 429 y, si cada sesión reintenta por su cuenta, el problema
+empeora justo en las horas de más uso. Todas las peticiones de un proceso
+pasan por un único `Planificador`, que:
+
+- une peticiones idénticas simultáneas: si otra sesión ya está pidiendo lo
+  mismo, se espera esa respuesta en vez de repetir la petición;
+- respeta un presupuesto de `por_minuto` peticiones (cubeta de fichas);
+- reintenta los errores de cuota y los errores transitorios con espera
+  exponencial con jitter (respetando `Retry-After` si la API lo indica), y
+  durante esa espera frena también a las demás peticiones.
+
+Si la respuesta no llega dentro de `espera_maxima` segundos se lanza
+`SinCuota`; quien llama sigue sirviendo los últimos datos que tenga.
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from gspread.exceptions import APIError
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+# Lecturas por minuto (la cuota por defecto de Sheets es 60 por usuario)
+POR_MINUTO = 50
+# Reintentos y espera exponencial (segundos) ante errores de cuota o de red
+REINTENTOS = 5
+ESPERA_BASE = 1.0
+ESPERA_TOPE = 32.0
+# Tiempo máximo que una petición espera por cuota y reintentos
+ESPERA_MAXIMA = 20.0
+
+# Errores de la API que vale la pena reintentar
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class SinCuota(Exception):
+    """La petición no se pudo completar dentro de la cuota ni del tiempo máximo."""
+
+
+def reintentable(error: Exception) -> bool:
+    if isinstance(error, APIError):
+        return error.code in CODIGOS_REINTENTABLES
+    return isinstance(error, (RequestsConnectionError, Timeout))
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["Retry-After"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class Planificador:
+    """Peticiones a la API de un proceso: unidas, limitadas por minuto y con reintentos."""
+
+    def __init__(self, por_minuto: float = POR_MINUTO, reintentos: int = REINTENTOS,
+                 espera_maxima: float = ESPERA_MAXIMA):
+        self.por_minuto = por_minuto
+        self.reintentos = reintentos
+        self.espera_maxima = espera_maxima
+        self.peticiones = 0          # peticiones enviadas a la API
+        self.unidas = 0              # peticiones resueltas con la respuesta de otra
+        self._fichas = float(por_minuto)
+        self._recarga = time.monotonic()
+        self._pausa_hasta = 0.0      # tras un error de cuota nadie pide antes de esto
+        self._en_curso: dict[object, Future] = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave, fn, reintentos: int | None = None):
+        """
+        Ejecuta `fn()` (una petición a la API) y retorna su resultado. Las
+        llamadas con la misma `clave` que llegan mientras otra está en curso
+        reciben el mismo resultado (o el mismo error).
+        """
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            propio = futuro is None
+            if propio:
+                futuro = self._en_curso[clave] = Future()
+            else:
+                self.unidas += 1
+        if not propio:
+            return futuro.result()
+        try:
+            futuro.set_result(self._con_reintentos(fn, self.reintentos if reintentos is None else reintentos))
+        except BaseException as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+        return futuro.result()
+
+    def _con_reintentos(self, fn, reintentos: int):
+        limite = time.monotonic() + self.espera_maxima
+        for intento in range(reintentos + 1):
+            self._esperar_ficha(limite)
+            try:
+                return fn()
+            except Exception as e:
+                if not reintentable(e):
+                    raise
+                espera = _retry_after(e) or random.uniform(0, min(ESPERA_TOPE, ESPERA_BASE * 2 ** intento))
+                with self._lock:
+                    self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + espera)
+                if intento == reintentos or time.monotonic() + espera > limite:
+                    raise SinCuota(f"Google Sheets no respondió dentro de la cuota: {e}") from e
+
+    def _esperar_ficha(self, limite: float) -> None:
+        """Toma una ficha del presupuesto por minuto, esperando si hace falta."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.por_minuto,
+                                   self._fichas + (ahora - self._recarga) * self.por_minuto / 60)
+                self._recarga = ahora
+                espera = max(self._pausa_hasta - ahora, 0.0)
+                if not espera and self._fichas >= 1:
+                    self._fichas -= 1
+                    self.peticiones += 1
+                    return
+                espera = espera or (1 - self._fichas) * 60 / self.por_minuto
+            if ahora + espera > limite:
+                raise SinCuota("Se agotó la cuota de peticiones a Google Sheets; intente en unos segundos")
+            time.sleep(espera)
@@ -0,0 +1,326 @@
+# data.py
+"""
+Capa única de acceso a Google Sheets para todas las páginas.
+
+- El cliente autorizado y el handle del spreadsheet se crean una sola vez por
+  proceso y se reutilizan entre sesiones (`st.cache_resource`).
+- Las hojas se mantienen en una copia local compartida entre sesiones que se
+  sincroniza de forma incremental (ver `sync.py`) como máximo cada
+  `CACHE_TTL_SECONDS`.
+- Las peticiones a la API pasan por un planificador que respeta la cuota por
+  minuto (`cuota_por_minuto`, ver `cuota.py`); si Google Sheets no responde
+  se siguen mostrando los últimos datos sincronizados, con un aviso.
+- Después de cada sincronización con cambios se guarda un snapshot local
+  (Arrow + SQLite, ver `snapshot.py`) en `SNAPSHOT_LOCAL`. Al reiniciar el
+  proceso se arranca desde ahí en vez de reprocesar la copia en JSON, y si no
+  se puede abrir Google Sheets se sirve en modo sin conexión, de sólo lectura
+  y con un aviso visible, hasta que vuelva a responder.
+- Con varios procesos, la app puede leer en cambio el snapshot que publica
+  `snapshot.py` (carpeta en `snapshot_dir` de los secrets o en la variable
+  `FASTRACK_SNAPSHOT_DIR`): sólo el sincronizador habla con Google Sheets.
+- `warm_up()` precarga los datos en segundo plano (una vez por proceso, al
+  iniciar sesión o al arrancar el servidor con `servidor.py`) y los mantiene
+  al día, así las páginas no pagan la carga inicial.
+- `refresh_button()` permite forzar una recarga manual desde la barra lateral.
+- `start_timing()` / `timing_panel()` miden cada etapa de la ejecución de una
+  página (ver `tiempos.py`); el desglose se muestra sólo a administradores.
+"""
+import hmac
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import gspread
+import pandas as pd
+import streamlit as st
+from google.oauth2 import service_account
+
+import consultas
+from cuota import POR_MINUTO, Planificador
+import tiempos
+import snapshot
+from snapshot import SnapshotEngine
+from sync import CACHE_DIR, SCOPES, SPREADSHEET_NAME, SyncEngine
+from tiempos import medir
+
+# Tiempo máximo que se sirve la copia local antes de buscar filas nuevas
+CACHE_TTL_SECONDS = 300
+# Cada cuánto el hilo de precarga revisa si hay datos nuevos
+WARM_UP_SECONDS = 60
+# Registro de tiempos por ejecución de página (JSON Lines)
+TIMING_LOG = CACHE_DIR / "tiempos.jsonl"
+# Snapshot local de los datos normalizados (arranque rápido y modo sin conexión)
+SNAPSHOT_LOCAL = CACHE_DIR / "snapshot"
+# Versiones del snapshot local que se conservan
+SNAPSHOT_CONSERVAR = 2
+# En modo sin conexión, cada cuánto se vuelve a intentar abrir Google Sheets
+RECONEXION_SECONDS = 60
+
+log = logging.getLogger("fastrack.data")
+
+# Versión del motor guardada en el snapshot local: (id del motor, versión)
+_persistida: tuple[int, int] | None = None
+# Una sola escritura del snapshot local a la vez (sesiones y hilo de precarga)
+_persistir_lock = threading.Lock()
+
+
+# ------------------------------------------------------------------
+# Recursos compartidos por proceso
+# ------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_client() -> gspread.Client:
+    """Cliente gspread autorizado con la cuenta de servicio."""
+    with medir("connect", "credenciales"):
+        credentials = service_account.Credentials.from_service_account_info(
+            st.secrets["gcp_service_account"], scopes=SCOPES
+        )
+        return gspread.authorize(credentials)
+
+
+@st.cache_resource(show_spinner=False)
+def get_spreadsheet() -> gspread.Spreadsheet:
+    """Handle del spreadsheet (evita repetir la búsqueda por nombre en Drive)."""
+    client = get_client()
+    with medir("connect", "abrir spreadsheet"):
+        return client.open(SPREADSHEET_NAME)
+
+
+def _ajuste(nombre: str):
+    """Ajuste opcional: variable de entorno `FASTRACK_<NOMBRE>` o `nombre` en los secrets."""
+    valor = os.environ.get(f"FASTRACK_{nombre.upper()}")
+    if valor:
+        return valor
+    try:
+        return st.secrets.get(nombre)
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_sync_engine() -> SyncEngine | SnapshotEngine:
+    """
+    Motor de datos compartido por todas las sesiones: el de sincronización
+    incremental (restaurado del snapshot local si lo hay) o, en modo
+    multi-proceso, el lector del snapshot compartido.
+    """
+    global _persistida
+    carpeta = _ajuste("snapshot_dir")
+    if carpeta:
+        return SnapshotEngine(Path(carpeta))
+    planificador = Planificador(por_minuto=float(_ajuste("cuota_por_minuto") or POR_MINUTO))
+    spreadsheet = get_spreadsheet()
+    with medir("restore", "snapshot local"):
+        inicial = snapshot.restaurar(SNAPSHOT_LOCAL)
+    engine = SyncEngine(spreadsheet, cache_dir=CACHE_DIR, planificador=planificador, inicial=inicial)
+    if engine.proceso.restaurada and engine.detalle.restaurada:
+        # La versión actual es la que ya está en disco (ver `_persistir`)
+        _persistida = (id(engine), engine.version)
+    return engine
+
+
+@st.cache_resource(show_spinner=False)
+def get_engine_sin_conexion() -> SnapshotEngine:
+    """
+    Motor de sólo lectura sobre el snapshot local, para cuando no se puede
+    abrir Google Sheets. Lanza `FileNotFoundError` si todavía no hay uno.
+    """
+    return SnapshotEngine(SNAPSHOT_LOCAL)
+
+
+def _persistir(engine: SyncEngine | SnapshotEngine) -> None:
+    """
+    Guarda en el snapshot local la versión actual de los datos, si no está ya.
+    Si otra sesión ya lo está guardando no la espera: esa escritura (o la
+    próxima sincronización) deja la versión en disco.
+    """
+    global _persistida
+    if not isinstance(engine, SyncEngine) or engine.movimientos.empty:
+        return
+    if (id(engine), engine.version) == _persistida or not _persistir_lock.acquire(blocking=False):
+        return
+    try:
+        version = (id(engine), engine.version)
+        if version == _persistida:
+            return
+        with medir("persist", "snapshot local", filas=len(engine.movimientos)):
+            nombre = snapshot.escribir(engine, SNAPSHOT_LOCAL, conservar=SNAPSHOT_CONSERVAR)
+        _persistida = version
+        log.info("Snapshot local %s guardado (%d movimientos)", nombre, len(engine.movimientos))
+    except OSError as e:
+        # Sin snapshot nuevo se sigue con el anterior; se reintenta en la próxima sincronización
+        log.warning("No se pudo guardar el snapshot local: %s", e)
+    finally:
+        _persistir_lock.release()
+
+
+def _modo_sin_conexion(error: Exception) -> SnapshotEngine | None:
+    """
+    Motor del snapshot local con un aviso de que los datos pueden estar
+    desactualizados; `None` (y el error) si no hay snapshot local.
+    """
+    try:
+        engine = get_engine_sin_conexion()
+        engine.sync(force_full=True)  # la última versión guardada antes de perder la conexión
+    except (OSError, ValueError) as e:
+        log.warning("Sin snapshot local para el modo sin conexión: %s", e)
+        st.error(f"Error al conectar con Google Sheets: {error}")
+        return None
+    creado = datetime.fromisoformat(engine.meta["creado"])
+    st.warning(
+        f"**Modo sin conexión (sólo lectura).** No se pudo conectar con Google Sheets ({error}). "
+        f"Se muestran los datos de la copia local del {creado:%d/%m/%Y a las %H:%M} "
+        f"(versión {engine.nombre}); los cambios posteriores en la planilla no aparecen.",
+        icon="⚠️",
+    )
+    st.sidebar.warning(f"Sin conexión: datos del {creado:%d/%m/%Y %H:%M}")
+    return engine
+
+
+# ------------------------------------------------------------------
+# Acceso a los datos desde las páginas
+# ------------------------------------------------------------------
+# Modo sin conexión: último intento fallido de abrir Google Sheets y su error
+_ultimo_intento = 0.0
+_ultimo_error: Exception | None = None
+
+
+def sync_data(force_full: bool = False) -> SyncEngine | SnapshotEngine | None:
+    """
+    Sincroniza las hojas si la copia local está vencida y retorna el motor;
+    si hubo cambios los guarda en el snapshot local (`_persistir`). Si la sincronización falla pero ya hay datos, avisa y retorna el motor con
+    los últimos datos sincronizados. Si no se puede abrir Google Sheets se
+    retorna el motor de sólo lectura del snapshot local, con un aviso, y se
+    reintenta cada `RECONEXION_SECONDS`; si tampoco hay snapshot local muestra
+    el error y retorna `None`.
+    """
+    global _ultimo_intento, _ultimo_error
+    if not force_full and time.time() - _ultimo_intento < RECONEXION_SECONDS:
+        return _modo_sin_conexion(_ultimo_error)
+    try:
+        # Sin spinner del caché: también se llama desde el hilo de precarga
+        with st.spinner("Cargando datos desde Google Sheets..."):
+            engine = get_sync_engine()
+    except Exception as e:
+        # Descartamos el handle por si quedó inválido (token vencido, permisos, etc.)
+        get_spreadsheet.clear()
+        _ultimo_intento, _ultimo_error = time.time(), e
+        return _modo_sin_conexion(e)
+    _ultimo_intento = 0.0
+    try:
+        engine.sync(max_age=CACHE_TTL_SECONDS, force_full=force_full)
+    except Exception as e:
+        if engine.movimientos.empty:
+            st.error(f"Error al conectar con Google Sheets: {e}")
+            return None
+        desde = (
+            f"sincronizados el {datetime.fromtimestamp(engine.last_sync):%d/%m/%Y a las %H:%M}"
+            if engine.last_sync else "de la copia local"
+        )
+        st.warning(f"No se pudo actualizar desde Google Sheets ({e}). Se muestran los datos {desde}.")
+    else:
+        # También sin el hilo de precarga (p. ej. al abrir una página directamente)
+        _persistir(engine)
+    return engine
+
+
+def refresh_button() -> None:
+    """Botón en la barra lateral para forzar la recarga completa de los datos."""
+    if st.sidebar.button("🔄 Actualizar datos", help="Descarga nuevamente PROCESO y DETALLE"):
+        sync_data(force_full=True)
+        st.rerun()
+
+
+# ------------------------------------------------------------------
+# Precarga en segundo plano
+# ------------------------------------------------------------------
+def _calentar(engine: SyncEngine | SnapshotEngine) -> None:
+    """Sincroniza y construye lo que las páginas usan en su primera ejecución."""
+    engine.sync(max_age=CACHE_TTL_SECONDS)
+    _persistir(engine)
+    for derivado in ("indice", "fechas", "entregas", "anomalias"):
+        getattr(engine, derivado)
+    consultas.clientes(engine)
+    consultas.ubicaciones(engine)
+
+
+def _mantener_caliente() -> None:
+    while True:
+        registro = tiempos.iniciar("precarga")
+        try:
+            _calentar(get_sync_engine())
+        except Exception:
+            # Se reintenta en la próxima vuelta; las páginas muestran su propio error
+            log.exception("Error al precargar los datos")
+        finally:
+            registro.cerrar()
+        time.sleep(WARM_UP_SECONDS)
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up() -> threading.Thread:
+    """
+    Inicia (una sola vez por proceso) un hilo que autoriza el cliente, carga y
+    normaliza las hojas y construye los índices y el estado actual mientras el
+    usuario está en la portada; después revisa cada `WARM_UP_SECONDS` si hay
+    datos nuevos y los deja listos antes de que una página los pida.
+    """
+    tiempos.configurar_log(TIMING_LOG)
+    hilo = threading.Thread(target=_mantener_caliente, name="fastrack-precarga", daemon=True)
+    hilo.start()
+    return hilo
+
+
+# ------------------------------------------------------------------
+# Tiempos por etapa
+# ------------------------------------------------------------------
+def _is_admin() -> bool:
+    """El panel de tiempos se habilita con `?admin=<admin_token>` en la URL."""
+    try:
+        token = st.secrets.get("admin_token")
+    except FileNotFoundError:
+        return False
+    return bool(token) and hmac.compare_digest(st.query_params.get("admin", ""), str(token))
+
+
+def start_timing(page: str) -> tiempos.Registro:
+    """Abre el registro de tiempos de esta ejecución (con cProfile si se pidió)."""
+    tiempos.configurar_log(TIMING_LOG)
+    perfilar = st.session_state.pop("perfilar_proxima", False) and _is_admin()
+    return tiempos.iniciar(page, perfilar=perfilar)
+
+
+def timing_panel() -> None:
+    """
+    Cierra el registro de la ejecución (queda en `TIMING_LOG`) y, para
+    administradores, muestra el desglose por etapa en la barra lateral.
+    """
+    registro = tiempos.actual()
+    if registro is None:
+        return
+    datos = registro.cerrar()
+    if not _is_admin():
+        return
+
+    with st.sidebar.expander("⏱️ Tiempos por etapa", expanded=True):
+        etapas = pd.DataFrame(datos["etapas"])
+        if not etapas.empty:
+            etapas = etapas.sort_values("inicio", kind="stable")
+            etapas["etapa"] = ["· " * n + e for n, e in zip(etapas["nivel"], etapas["etapa"])]
+            etapas["ms"] = (etapas["segundos"] * 1000).round(1)
+            etapas["filas"] = etapas["filas"].astype("Int64")
+            st.dataframe(etapas[["etapa", "detalle", "ms", "filas"]], hide_index=True)
+        st.caption(f"Total de la ejecución: {datos['total'] * 1000:.0f} ms")
+
+        if registro.perfil is not None:
+            st.code(registro.perfil_texto(), language=None)
+            st.download_button(
+                "⬇️ Descargar perfil (.prof)",
+                data=registro.perfil_bytes(),
+                file_name=f"perfil_{registro.pagina}.prof",
+            )
+        elif st.button("🔬 Perfilar la próxima ejecución"):
+            st.session_state["perfilar_proxima"] = True
+            st.rerun()
@@ -0,0 +1,365 @@
+# db.py
+"""
+Base de datos embebida (SQLite en memoria) con los movimientos sincronizados.
+
+Las tablas `proceso` y `detalle` guardan el registro completo, indexado por
+IDPROC para las uniones que mantienen `estado` y por CLIENTE y UBICACION para
+las listas de las páginas. Las consultas por cilindro, por fecha y de
+rotación usan en cambio los índices en memoria (`indices.py`, `rotacion.py`).
+
+FECHA se guarda como texto ISO (`YYYY-MM-DD`) y FECHA_HORA como
+`YYYY-MM-DD HH:MM:SS`, así el orden lexicográfico coincide con el cronológico.
+
+La tabla `estado` guarda el último movimiento de cada SERIE (estado actual del
+cilindro). Se mantiene con upserts sólo para las filas nuevas o afectadas de
+cada sincronización, de modo que las páginas no necesitan ordenar toda la
+historia para saber dónde está cada cilindro.
+
+Dos tablas de resumen alimentan la página de resumen de la flota y se
+mantienen en la misma transacción que `estado`:
+- `resumen_estado`: cilindros por CLIENTE (entregados al cliente), por
+  UBICACION y por SERVICIO según el estado actual. En una sincronización
+  incremental se restan los conteos de las SERIE afectadas antes del upsert y
+  se suman los de después;
+- `movimientos_dia`: filas de DETALLE por FECHA y PROCESO; se suman sólo los
+  pares DETALLE-PROCESO nuevos.
+Con una carga completa ambas se recalculan con un GROUP BY.
+
+Las filas de DETALLE marcadas por la validación (`ANOMALA`, ver
+`validacion.validar`) se guardan pero no cuentan para `estado` ni para los
+resúmenes.
+"""
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from schema import fecha_hora
+
+ENTREGAS = ("DESPACHO", "ENTREGA")
+RETORNOS = ("RETIRO", "RECEPCION")
+
+SCHEMA = """
+CREATE TABLE proceso (
+    IDPROC TEXT,
+    FECHA TEXT,
+    HORA TEXT,
+    FECHA_HORA TEXT,
+    PROCESO TEXT,
+    CLIENTE TEXT,
+    UBICACION TEXT
+);
+CREATE TABLE detalle (
+    IDPROC TEXT,
+    SERIE TEXT,
+    SERVICIO TEXT,
+    ANOMALA INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE estado (
+    SERIE TEXT PRIMARY KEY,
+    RID INTEGER,
+    IDPROC TEXT,
+    FECHA TEXT,
+    HORA TEXT,
+    FECHA_HORA TEXT,
+    PROCESO TEXT,
+    CLIENTE TEXT,
+    UBICACION TEXT,
+    SERVICIO TEXT
+);
+CREATE TABLE resumen_estado (
+    DIMENSION TEXT,
+    VALOR TEXT,
+    CILINDROS INTEGER,
+    PRIMARY KEY (DIMENSION, VALOR)
+);
+CREATE TABLE movimientos_dia (
+    FECHA TEXT,
+    PROCESO TEXT,
+    MOVIMIENTOS INTEGER,
+    PRIMARY KEY (FECHA, PROCESO)
+);
+CREATE INDEX ix_proceso_idproc ON proceso (IDPROC);
+CREATE INDEX ix_proceso_cliente ON proceso (CLIENTE);
+CREATE INDEX ix_proceso_ubicacion ON proceso (UBICACION);
+CREATE INDEX ix_detalle_idproc ON detalle (IDPROC);
+CREATE INDEX ix_estado_cliente ON estado (CLIENTE);
+CREATE INDEX ix_estado_ubicacion ON estado (UBICACION);
+"""
+
+# Upsert del estado actual: para cada fila de DETALLE nueva (rowid > :det) o
+# cuyo PROCESO acaba de llegar (proceso.rowid > :proc), salvo las marcadas como
+# anómalas, se reemplaza el estado
+# de su SERIE sólo si el movimiento es más reciente. El orden es el mismo de
+# las páginas: FECHA_HORA descendente, sin fecha al final y, a igual fecha, la
+# última fila registrada.
+UPSERT_ESTADO = """
+INSERT INTO estado
+SELECT d.SERIE, d.rowid, d.IDPROC, p.FECHA, p.HORA, p.FECHA_HORA,
+       p.PROCESO, p.CLIENTE, p.UBICACION, d.SERVICIO
+FROM detalle d
+LEFT JOIN proceso p ON p.IDPROC = d.IDPROC
+WHERE d.ANOMALA = 0 AND d.rowid IN (
+    SELECT rowid FROM detalle WHERE rowid > :det
+    UNION
+    SELECT d2.rowid FROM proceso p2 JOIN detalle d2 ON d2.IDPROC = p2.IDPROC
+    WHERE p2.rowid > :proc
+)
+ON CONFLICT (SERIE) DO UPDATE SET
+    RID = excluded.RID, IDPROC = excluded.IDPROC, FECHA = excluded.FECHA,
+    HORA = excluded.HORA, FECHA_HORA = excluded.FECHA_HORA,
+    PROCESO = excluded.PROCESO, CLIENTE = excluded.CLIENTE,
+    UBICACION = excluded.UBICACION, SERVICIO = excluded.SERVICIO
+WHERE (excluded.FECHA_HORA IS NOT NULL
+       AND (estado.FECHA_HORA IS NULL OR excluded.FECHA_HORA > estado.FECHA_HORA))
+   OR (excluded.FECHA_HORA IS estado.FECHA_HORA AND excluded.RID >= estado.RID)
+"""
+
+# SERIE afectadas por una sincronización: las de filas de DETALLE nuevas o cuyo
+# PROCESO acaba de llegar (las mismas que revisa `UPSERT_ESTADO`)
+AFECTADAS = """
+INSERT INTO temp.afectadas
+SELECT SERIE FROM detalle WHERE rowid > :det
+UNION
+SELECT d.SERIE FROM proceso p JOIN detalle d ON d.IDPROC = p.IDPROC WHERE p.rowid > :proc
+"""
+
+# Cilindros por dimensión en `{tabla}` (con el esquema de `estado`). CLIENTE
+# cuenta sólo los entregados al cliente, como `cilindros_en_cliente`; los
+# valores vacíos se guardan como ''. `{signo}` es 1 para sumar y -1 para restar.
+SUMAR_RESUMEN = f"""
+INSERT INTO resumen_estado
+SELECT * FROM (
+    SELECT 'CLIENTE', COALESCE(CLIENTE, ''), {{signo}} * COUNT(*) FROM {{tabla}}
+    WHERE PROCESO IN {ENTREGAS} GROUP BY 2
+    UNION ALL
+    SELECT 'UBICACION', COALESCE(UBICACION, ''), {{signo}} * COUNT(*) FROM {{tabla}} GROUP BY 2
+    UNION ALL
+    SELECT 'SERVICIO', COALESCE(SERVICIO, ''), {{signo}} * COUNT(*) FROM {{tabla}} GROUP BY 2
+) WHERE true
+ON CONFLICT (DIMENSION, VALOR) DO UPDATE SET CILINDROS = CILINDROS + excluded.CILINDROS
+"""
+
+# Movimientos por día y PROCESO de los pares DETALLE-PROCESO nuevos (sin los
+# marcados como anómalos): filas de DETALLE nuevas, y filas anteriores cuyo
+# PROCESO acaba de llegar
+SUMAR_MOVIMIENTOS_DIA = """
+INSERT INTO movimientos_dia
+SELECT FECHA, COALESCE(PROCESO, ''), COUNT(*) FROM (
+    SELECT p.FECHA, p.PROCESO FROM detalle d JOIN proceso p ON p.IDPROC = d.IDPROC
+    WHERE d.rowid > :det AND d.ANOMALA = 0
+    UNION ALL
+    SELECT p.FECHA, p.PROCESO FROM proceso p JOIN detalle d ON d.IDPROC = p.IDPROC
+    WHERE p.rowid > :proc AND d.rowid <= :det AND d.ANOMALA = 0
+) WHERE FECHA IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (FECHA, PROCESO) DO UPDATE SET MOVIMIENTOS = MOVIMIENTOS + excluded.MOVIMIENTOS
+"""
+
+# Bytes de una copia de sólo lectura que SQLite lee con `mmap` (ver `open_readonly`)
+MMAP_BYTES = 1 << 30
+
+PROCESO_COLS = ["IDPROC", "FECHA", "HORA", "FECHA_HORA", "PROCESO", "CLIENTE", "UBICACION"]
+DETALLE_COLS = ["IDPROC", "SERIE", "SERVICIO", "ANOMALA"]
+
+
+def _rows(df: pd.DataFrame, cols: list[str]) -> list[tuple]:
+    """Filas listas para `executemany` (columnas faltantes y NaN como NULL)."""
+    df = df.reindex(columns=cols).astype(object)
+    return list(df.where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def _prepare_proceso(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["IDPROC"] = df["IDPROC"].astype(str)
+    ts = fecha_hora(df)
+    df["FECHA"] = ts.dt.strftime("%Y-%m-%d")
+    df["HORA"] = ts.dt.strftime("%H:%M:%S")
+    df["FECHA_HORA"] = ts.dt.strftime("%Y-%m-%d %H:%M:%S")
+    return df
+
+
+def _prepare_detalle(df: pd.DataFrame, anomalas: np.ndarray | None = None) -> pd.DataFrame:
+    # SERIE ya viene normalizada por `schema.normalizar`
+    anomala = 0 if anomalas is None else np.asarray(anomalas, dtype=int)
+    return df.assign(IDPROC=df["IDPROC"].astype(str), ANOMALA=anomala)
+
+
+class MovementDB:
+    """Conexión SQLite compartida entre sesiones, protegida por un lock."""
+
+    def __init__(self, con: sqlite3.Connection | None = None):
+        if con is None:
+            con = sqlite3.connect(":memory:", check_same_thread=False)
+            con.executescript(SCHEMA)
+        self.con = con
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open_readonly(cls, path) -> "MovementDB":
+        """
+        Abre una copia escrita con `save` sólo para lectura. El archivo no
+        cambia nunca (cada versión es un archivo nuevo), así SQLite lo lee con
+        `mmap` y varios procesos comparten las mismas páginas en memoria.
+        """
+        con = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        con.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        return cls(con)
+
+    @classmethod
+    def from_file(cls, path) -> "MovementDB":
+        """Base en memoria (modificable) con el contenido de un archivo escrito con `save`."""
+        con = sqlite3.connect(":memory:", check_same_thread=False)
+        origen = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            origen.backup(con)
+        finally:
+            origen.close()
+        return cls(con)
+
+    def save(self, path) -> None:
+        """Copia la base completa (tablas e índices) a un archivo SQLite."""
+        destino = sqlite3.connect(path)
+        try:
+            with self._lock:
+                self.con.backup(destino)
+        finally:
+            destino.close()
+
+    def load(self, df_proceso: pd.DataFrame, df_detalle: pd.DataFrame,
+             anomalas: np.ndarray | None = None) -> None:
+        """
+        Reemplaza todo el contenido (sincronización completa). `anomalas`
+        marca, para cada fila de `df_detalle`, si se excluye del estado.
+        """
+        with self._lock, self.con:
+            self.con.execute("DELETE FROM proceso")
+            self.con.execute("DELETE FROM detalle")
+            self.con.execute("DELETE FROM estado")
+            self.con.execute("DELETE FROM resumen_estado")
+            self.con.execute("DELETE FROM movimientos_dia")
+            self._insert(df_proceso, df_detalle, anomalas)
+
+    def append(self, df_proceso: pd.DataFrame, df_detalle: pd.DataFrame,
+               anomalas: np.ndarray | None = None) -> None:
+        """Agrega filas nuevas (sincronización incremental)."""
+        with self._lock, self.con:
+            self._insert(df_proceso, df_detalle, anomalas)
+
+    def _insert(self, df_proceso: pd.DataFrame, df_detalle: pd.DataFrame,
+                anomalas: np.ndarray | None = None) -> None:
+        (max_det,), = self.con.execute("SELECT COALESCE(MAX(rowid), 0) FROM detalle")
+        (max_proc,), = self.con.execute("SELECT COALESCE(MAX(rowid), 0) FROM proceso")
+        if not df_proceso.empty and "IDPROC" in df_proceso.columns:
+            self.con.executemany(
+                "INSERT INTO proceso VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _rows(_prepare_proceso(df_proceso), PROCESO_COLS),
+            )
+        if not df_detalle.empty and "IDPROC" in df_detalle.columns:
+            self.con.executemany(
+                "INSERT INTO detalle VALUES (?, ?, ?, ?)",
+                _rows(_prepare_detalle(df_detalle, anomalas), DETALLE_COLS),
+            )
+        cursores = {"det": max_det, "proc": max_proc}
+        if max_det == max_proc == 0:
+            # Carga completa: los resúmenes se calculan de una vez al final
+            self.con.execute(UPSERT_ESTADO, cursores)
+            self.con.execute(SUMAR_RESUMEN.format(tabla="(SELECT * FROM estado WHERE SERIE IS NOT NULL)", signo=1))
+        else:
+            self.con.execute("CREATE TEMP TABLE IF NOT EXISTS afectadas (SERIE TEXT PRIMARY KEY)")
+            self.con.execute("DELETE FROM temp.afectadas")
+            self.con.execute(AFECTADAS, cursores)
+            # Se restan las SERIE afectadas como estaban y se suman como quedan
+            afectadas = "(SELECT * FROM estado WHERE SERIE IN temp.afectadas)"
+            self.con.execute(SUMAR_RESUMEN.format(tabla=afectadas, signo=-1))
+            self.con.execute(UPSERT_ESTADO, cursores)
+            self.con.execute(SUMAR_RESUMEN.format(tabla=afectadas, signo=1))
+            self.con.execute("DELETE FROM resumen_estado WHERE CILINDROS = 0")
+        self.con.execute(SUMAR_MOVIMIENTOS_DIA, cursores)
+
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(sql, self.con, params=params)
+
+
+# ------------------------------------------------------------------
+# Consultas de las páginas
+# ------------------------------------------------------------------
+def clientes(db: MovementDB) -> list[str]:
+    df = db.query("SELECT DISTINCT CLIENTE FROM proceso WHERE CLIENTE IS NOT NULL AND CLIENTE <> ''")
+    return df["CLIENTE"].tolist()
+
+
+def ubicaciones(db: MovementDB) -> list[str]:
+    df = db.query(
+        "SELECT DISTINCT UBICACION FROM proceso WHERE UBICACION IS NOT NULL AND UBICACION <> ''"
+    )
+    return df["UBICACION"].tolist()
+
+
+def estado_actual(db: MovementDB) -> pd.DataFrame:
+    """Último movimiento de cada SERIE (tabla `estado`)."""
+    return db.query(
+        """
+        SELECT SERIE, IDPROC, FECHA, HORA, PROCESO, CLIENTE, UBICACION, SERVICIO
+        FROM estado
+        ORDER BY FECHA_HORA DESC
+        """
+    )
+
+
+def cilindros_en_cliente(db: MovementDB, cliente: str) -> pd.DataFrame:
+    """Cilindros cuyo último movimiento es DESPACHO o ENTREGA al cliente."""
+    return db.query(
+        f"""
+        SELECT SERIE, IDPROC, FECHA, HORA, PROCESO, SERVICIO
+        FROM estado
+        WHERE CLIENTE = ? AND PROCESO IN {ENTREGAS}
+        ORDER BY FECHA_HORA DESC
+        """,
+        (cliente,),
+    )
+
+
+def ultimo_movimiento_por_ubicacion(db: MovementDB, ubicacion: str) -> pd.DataFrame:
+    """Último movimiento de los cilindros que actualmente están en la ubicación."""
+    return db.query(
+        """
+        SELECT SERIE, IDPROC, FECHA, PROCESO, CLIENTE, SERVICIO, UBICACION
+        FROM estado
+        WHERE UBICACION = ?
+        ORDER BY FECHA_HORA DESC
+        """,
+        (ubicacion,),
+    )
+
+
+# ------------------------------------------------------------------
+# Resumen de la flota (tablas de resumen)
+# ------------------------------------------------------------------
+def resumen_estado(db: MovementDB, dimension: str) -> pd.DataFrame:
+    """Cilindros por valor de `dimension` (CLIENTE, UBICACION o SERVICIO), de más a menos."""
+    df = db.query(
+        """
+        SELECT VALOR, CILINDROS
+        FROM resumen_estado
+        WHERE DIMENSION = ? AND CILINDROS > 0
+        ORDER BY CILINDROS DESC, VALOR
+        """,
+        (dimension,),
+    )
+    return df.rename(columns={"VALOR": dimension})
+
+
+def movimientos_por_dia(db: MovementDB, desde: str) -> pd.DataFrame:
+    """Movimientos por FECHA y PROCESO desde `desde` (ISO, inclusive)."""
+    return db.query(
+        """
+        SELECT FECHA, PROCESO, MOVIMIENTOS
+        FROM movimientos_dia
+        WHERE FECHA >= ?
+        ORDER BY FECHA, PROCESO
+        """,
+        (desde,),
+    )
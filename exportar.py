@@ -0,0 +1,111 @@
+# exportar.py
+"""
+Exportación de resultados a CSV comprimido, Excel (XLSX) y Parquet.
+
+Los archivos se escriben por bloques de `BLOQUE` filas, sin armar antes el
+archivo completo en memoria como texto: el CSV pasa por gzip a medida que se
+escribe, el XLSX usa el modo de sólo escritura de openpyxl (las filas se van
+volcando a disco) y el Parquet escribe un row group por bloque. El destino es
+un archivo temporal que pasa a disco al superar `EN_MEMORIA` bytes.
+
+Las páginas sólo generan un archivo cuando el usuario pide la descarga (ver
+`tablas.botones_descarga`); `reportes.py` usa las mismas funciones.
+"""
+import gzip
+import io
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Filas por bloque de escritura
+BLOQUE = 50_000
+# Tamaño desde el cual el archivo temporal pasa de memoria a disco
+EN_MEMORIA = 16 * 1024 * 1024
+# Filas por hoja de Excel (el máximo es 1.048.576, incluido el encabezado)
+FILAS_XLSX = 1_048_575
+
+FORMATOS = {
+    "csv.gz": "application/gzip",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+}
+
+
+def _bloques(df: pd.DataFrame, tamano: int = BLOQUE):
+    for inicio in range(0, len(df), tamano):
+        yield df.iloc[inicio:inicio + tamano]
+
+
+def a_csv(df: pd.DataFrame, destino: BinaryIO, comprimir: bool = True) -> None:
+    salida = gzip.GzipFile(fileobj=destino, mode="wb") if comprimir else destino
+    texto = io.TextIOWrapper(salida, encoding="utf-8", newline="")
+    df.iloc[0:0].to_csv(texto, index=False)
+    for bloque in _bloques(df):
+        bloque.to_csv(texto, index=False, header=False)
+    texto.flush()
+    texto.detach()
+    if comprimir:
+        salida.close()
+
+
+def _filas_excel(bloque: pd.DataFrame):
+    """Filas con tipos que openpyxl acepta (categorías como texto, nulos vacíos)."""
+    for col in bloque.columns[bloque.dtypes.map(lambda t: isinstance(t, pd.CategoricalDtype))]:
+        bloque = bloque.assign(**{col: bloque[col].astype(object)})
+    bloque = bloque.astype(object)
+    return bloque.where(bloque.notna(), None).itertuples(index=False, name=None)
+
+
+def a_xlsx(df: pd.DataFrame, destino: BinaryIO, hoja: str = "Datos") -> None:
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    for n, inicio in enumerate(range(0, max(len(df), 1), FILAS_XLSX), start=1):
+        ws = libro.create_sheet(hoja[:31] if n == 1 else f"{hoja[:27]} {n}")
+        ws.append([str(c) for c in df.columns])
+        for bloque in _bloques(df.iloc[inicio:inicio + FILAS_XLSX]):
+            for fila in _filas_excel(bloque):
+                ws.append(fila)
+    libro.save(destino)
+
+
+def a_parquet(df: pd.DataFrame, destino: BinaryIO) -> None:
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(destino, esquema) as writer:
+        for bloque in _bloques(df):
+            writer.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+
+def escribir(df: pd.DataFrame, formato: str, destino: BinaryIO) -> None:
+    """Escribe `df` en `destino` (archivo binario) en el formato pedido."""
+    if formato == "csv.gz":
+        a_csv(df, destino)
+    elif formato == "csv":
+        a_csv(df, destino, comprimir=False)
+    elif formato == "xlsx":
+        a_xlsx(df, destino)
+    elif formato == "parquet":
+        a_parquet(df, destino)
+    else:
+        raise ValueError(f"Formato desconocido: {formato}")
+
+
+def exportar(df: pd.DataFrame, formato: str) -> BinaryIO:
+    """Archivo temporal (posicionado al inicio) con `df` en el formato pedido."""
+    destino = tempfile.SpooledTemporaryFile(max_size=EN_MEMORIA)
+    escribir(df, formato, destino)
+    destino.seek(0)
+    return destino
+
+
+def guardar(df: pd.DataFrame, path: Path, formato: str) -> Path:
+    """Escribe `df` en `path` con la extensión del formato."""
+    path = Path(path).with_name(f"{Path(path).name}.{formato}")
+    with path.open("wb") as f:
+        escribir(df, formato, f)
+    return path
@@ -0,0 +1,108 @@
+# historico.py
+"""
+Estado de la flota a una fecha pasada ("¿qué cilindros tenía el cliente X el
+1 de marzo?").
+
+La tabla `estado` de `db.py` sólo guarda el último movimiento de cada SERIE,
+es decir, el estado actual. Para una fecha anterior habría que filtrar toda la
+historia hasta esa fecha y volver a quedarse con el último movimiento de cada
+cilindro. En su lugar, `EstadoHistorico` se construye una vez por versión de
+los datos con:
+
+- el registro de eventos: los movimientos con fecha, ordenados por FECHA_HORA
+  (a igual FECHA_HORA, en el orden en que se registraron, como en
+  `db.UPSERT_ESTADO`);
+- puntos de control: al comienzo de cada mes (`FRECUENCIA`), el último evento
+  de cada SERIE hasta ese momento.
+
+El estado a una fecha cualquiera parte del punto de control anterior más
+cercano y aplica sólo los eventos desde ese punto hasta la fecha (a lo más un
+mes de movimientos). Los movimientos sin fecha válida no se pueden ubicar en
+el tiempo y quedan fuera, igual que los excluidos por la validación (ver
+`validacion.validar`).
+"""
+import numpy as np
+import pandas as pd
+
+from schema import fecha_hora
+
+# Frecuencia de los puntos de control (alias de pandas; "MS" = comienzo de mes)
+FRECUENCIA = "MS"
+
+# Valor de una SERIE sin movimientos hasta la fecha
+_SIN = -1
+
+
+def _aplicar(estado: np.ndarray, codigos: np.ndarray, inicio: int) -> None:
+    """
+    Aplica a `estado` los eventos `codigos` (que comienzan en la posición
+    `inicio` del registro): cada SERIE queda con el último de sus eventos.
+    """
+    if not len(codigos):
+        return
+    # Última aparición de cada SERIE: primera al recorrer los eventos al revés
+    unicos, desde_el_final = np.unique(codigos[::-1], return_index=True)
+    estado[unicos] = inicio + len(codigos) - 1 - desde_el_final
+
+
+class EstadoHistorico:
+    """Último movimiento de cada SERIE a cualquier fecha, con puntos de control mensuales."""
+
+    def __init__(self, df_movimientos: pd.DataFrame, frecuencia: str = FRECUENCIA,
+                 excluidos: np.ndarray | None = None):
+        self.movimientos = df_movimientos
+        if df_movimientos.empty or "SERIE" not in df_movimientos.columns:
+            ts = pd.Series(pd.NaT, index=df_movimientos.index, dtype="datetime64[ns]")
+            series = pd.Series(index=df_movimientos.index, dtype=object)
+        else:
+            ts, series = fecha_hora(df_movimientos), df_movimientos["SERIE"]
+        valido = ts.notna().to_numpy() & series.notna().to_numpy()
+        if excluidos is not None:
+            valido &= ~excluidos
+        pos = np.flatnonzero(valido)
+        orden = np.argsort(ts.to_numpy()[pos], kind="stable")
+
+        # Registro de eventos: posición en `movimientos`, FECHA_HORA y código de SERIE
+        self._pos = pos[orden]
+        self._ts = ts.to_numpy()[self._pos]
+        self._codigos, self.series = pd.factorize(series.to_numpy()[self._pos])
+        tipo = np.int32 if len(self._pos) < np.iinfo(np.int32).max else np.int64
+
+        # Puntos de control: `_bordes[k]` eventos anteriores a `cortes[k]`
+        # y, en `_estados[k]`, el último de ellos para cada SERIE
+        if len(self._ts):
+            self.cortes = pd.date_range(self._ts[0], self._ts[-1], freq=frecuencia)
+        else:
+            self.cortes = pd.DatetimeIndex([])
+        self._bordes = np.searchsorted(self._ts, self.cortes.to_numpy(), side="left")
+        self._estados = np.full((len(self.cortes), len(self.series)), _SIN, dtype=tipo)
+        estado = np.full(len(self.series), _SIN, dtype=tipo)
+        anterior = 0
+        for k, borde in enumerate(self._bordes):
+            _aplicar(estado, self._codigos[anterior:borde], anterior)
+            self._estados[k] = estado
+            anterior = borde
+
+    def __len__(self) -> int:
+        """Eventos en el registro (movimientos con fecha)."""
+        return len(self._pos)
+
+    def _estado(self, fecha) -> np.ndarray:
+        """Para cada SERIE, su último evento con FECHA_HORA <= `fecha` (o `_SIN`)."""
+        hasta = np.searchsorted(self._ts, np.datetime64(pd.Timestamp(fecha)), side="right")
+        k = np.searchsorted(self._bordes, hasta, side="right") - 1
+        if k >= 0:
+            estado, inicio = self._estados[k].copy(), int(self._bordes[k])
+        else:
+            estado, inicio = np.full(len(self.series), _SIN, dtype=self._estados.dtype), 0
+        _aplicar(estado, self._codigos[inicio:hasta], inicio)
+        return estado
+
+    def al(self, fecha) -> pd.DataFrame:
+        """
+        Último movimiento hasta `fecha` (inclusive) de cada SERIE que ya tenía
+        movimientos, del más reciente al más antiguo.
+        """
+        eventos = self._estado(fecha)
+        eventos = np.sort(eventos[eventos != _SIN])[::-1]
+        return self.movimientos.iloc[self._pos[eventos]]
@@ -0,0 +1,159 @@
+# indices.py
+"""
+Índices en memoria para búsquedas por cilindro.
+
+`CylinderIndex` se construye una vez por versión de los datos y permite:
+- SERIE -> posiciones de sus filas en la tabla de movimientos (hash), de modo
+  que el historial de un cilindro cuesta O(sus movimientos) sin importar el
+  tamaño de la flota;
+- IDPROC -> fila de PROCESO;
+- búsqueda por prefijo de SERIE sobre un arreglo ordenado de claves
+  (búsqueda binaria), para cuando el operador escribe la serie incompleta.
+
+`DateIndex` mantiene PROCESO ordenado por una columna datetime64 FECHA_HORA
+(FECHA + HORA) y resuelve rangos de fecha/hora con búsqueda binaria
+(`searchsorted`), de modo que una consulta por rango es un corte directo.
+"""
+import numpy as np
+import pandas as pd
+
+from schema import con_fecha_y_hora, fecha_hora
+
+# Columnas de un listado de movimientos, en el orden en que se muestran
+MOVIMIENTO_COLS = ["FECHA", "HORA", "IDPROC", "PROCESO", "CLIENTE", "UBICACION", "SERIE", "SERVICIO"]
+
+
+class GroupIndex:
+    """
+    Clave -> posiciones de sus filas. Las filas se agrupan por código de clave
+    con un único argsort y se guarda el tramo [inicio, fin) de cada clave.
+    """
+
+    def __init__(self, keys: pd.Series):
+        codes, uniques = pd.factorize(keys)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self._order = np.argsort(codes, kind="stable")[len(codes) - counts.sum():]
+        self._bounds = np.concatenate([[0], np.cumsum(counts)])
+        self._slot = {key: i for i, key in enumerate(uniques)}
+        self.uniques = uniques
+
+    def __contains__(self, key) -> bool:
+        return key in self._slot
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def positions(self, key) -> np.ndarray:
+        slot = self._slot.get(key)
+        if slot is None:
+            return np.empty(0, dtype=np.intp)
+        return self._order[self._bounds[slot]:self._bounds[slot + 1]]
+
+    def positions_many(self, keys) -> np.ndarray:
+        parts = [self.positions(k) for k in keys]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+
+class CylinderIndex:
+    def __init__(self, df_proceso: pd.DataFrame, df_movimientos: pd.DataFrame):
+        self.proceso = df_proceso
+        self.movimientos = df_movimientos
+
+        series = df_movimientos["SERIE"] if "SERIE" in df_movimientos else pd.Series(dtype=str)
+        self._series = GroupIndex(series)
+
+        # Claves ordenadas para búsqueda por prefijo
+        self.keys = np.sort(np.asarray(self._series.uniques, dtype=str))
+
+        # IDPROC -> fila de PROCESO (la última si el IDPROC estuviera repetido)
+        if "IDPROC" in df_proceso.columns:
+            ids = df_proceso["IDPROC"]
+            self._proc_pos = dict(zip(ids, range(len(ids))))
+        else:
+            self._proc_pos = {}
+
+    def __contains__(self, serie: str) -> bool:
+        return serie in self._series
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def positions(self, serie: str) -> np.ndarray:
+        """Posiciones de las filas de `serie` en la tabla de movimientos."""
+        return self._series.positions(serie)
+
+    def proceso_rows(self, idprocs) -> pd.DataFrame:
+        """Filas de PROCESO para los IDPROC dados (se omiten los inexistentes)."""
+        pos = [self._proc_pos[i] for i in idprocs if i in self._proc_pos]
+        return self.proceso.iloc[pos]
+
+    def historial(self, serie: str) -> pd.DataFrame:
+        """
+        Movimientos de un cilindro (sólo los que tienen PROCESO), en orden
+        cronológico, con FECHA en formato ISO y HORA.
+        """
+        return self.historiales([serie]).drop(columns="FECHA_HORA")
+
+    def historiales(self, series) -> pd.DataFrame:
+        """
+        Movimientos de varios cilindros en una sola pasada (un corte por SERIE
+        y una única unión con PROCESO), ordenados por SERIE y luego en orden
+        cronológico. Incluye FECHA_HORA para resúmenes posteriores.
+        """
+        pos = self._series.positions_many(series)
+        det = self.movimientos.iloc[pos][["IDPROC", "SERIE", "SERVICIO"]]
+        proc = self.proceso_rows(det["IDPROC"].unique())
+        proc = proc.assign(FECHA_HORA=fecha_hora(proc))
+        cols = [c for c in proc.columns if c not in det.columns or c == "IDPROC"]
+        df = det.merge(proc[cols], on="IDPROC", how="inner")
+        # Cada SERIE queda contigua (positions_many); el orden estable lo conserva
+        df["_grupo"] = pd.factorize(df["SERIE"])[0]
+        df = df.sort_values(["_grupo", "FECHA_HORA"], na_position="last", kind="stable")
+        df = con_fecha_y_hora(df)
+        cols = [c for c in MOVIMIENTO_COLS if c in df.columns] + ["FECHA_HORA"]
+        return df[cols].reset_index(drop=True)
+
+    def prefix(self, prefijo: str, limit: int = 50) -> list[str]:
+        """SERIE que comienzan con `prefijo` (búsqueda binaria sobre las claves)."""
+        lo = np.searchsorted(self.keys, prefijo, side="left")
+        hi = np.searchsorted(self.keys, prefijo + "￿", side="left")
+        return self.keys[lo:min(hi, lo + limit)].tolist()
+
+
+class DateIndex:
+    """PROCESO ordenado por FECHA_HORA con cortes por rango vía búsqueda binaria."""
+
+    def __init__(self, df_proceso: pd.DataFrame, df_movimientos: pd.DataFrame):
+        proc = df_proceso.assign(FECHA_HORA=fecha_hora(df_proceso))
+        # Las filas sin fecha válida quedan fuera del índice
+        proc = proc[proc["FECHA_HORA"].notna()]
+        self.proceso = proc.sort_values("FECHA_HORA", kind="stable").reset_index(drop=True)
+        self._ts = self.proceso["FECHA_HORA"].to_numpy()
+
+        self.movimientos = df_movimientos
+        ids = df_movimientos["IDPROC"] if "IDPROC" in df_movimientos else pd.Series(dtype=str)
+        self._idproc = GroupIndex(ids)
+
+    def __len__(self) -> int:
+        return len(self.proceso)
+
+    def slice(self, desde, hasta) -> pd.DataFrame:
+        """Filas de PROCESO con `desde <= FECHA_HORA <= hasta`."""
+        lo = np.searchsorted(self._ts, np.datetime64(pd.Timestamp(desde)), side="left")
+        hi = np.searchsorted(self._ts, np.datetime64(pd.Timestamp(hasta)), side="right")
+        return self.proceso.iloc[lo:hi]
+
+    def rango(self, desde, hasta) -> pd.DataFrame:
+        """
+        Movimientos entre `desde` y `hasta` (inclusive): cada PROCESO del rango
+        con la SERIE y SERVICIO de su detalle (uno a muchos; sin detalle queda
+        una fila con SERIE vacía).
+        """
+        proc = self.slice(desde, hasta)
+        pos = self._idproc.positions_many(proc["IDPROC"].unique())
+        det = self.movimientos.iloc[pos][["IDPROC", "SERIE", "SERVICIO"]]
+        df = proc.drop(columns=["SERIE", "SERVICIO"], errors="ignore").merge(
+            det, on="IDPROC", how="left"
+        )
+        df = con_fecha_y_hora(df)
+        return df[[c for c in MOVIMIENTO_COLS if c in df.columns]]
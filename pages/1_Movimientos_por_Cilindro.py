@@ -1,48 +1,31 @@
 import streamlit as st
-import gspread
-from google.oauth2 import service_account
-import pandas as pd
 
 # 1) Importamos la función de autenticación
 from auth import check_password
+from consultas import (
+    buscar_cilindro,
+    historial_cilindro,
+    historial_cilindros,
+    leer_series,
+    leer_series_csv,
+)
+from data import refresh_button, start_timing, sync_data, timing_panel
+from tablas import botones_descarga, tabla_paginada
+from tiempos import medir
 
 # Primero verificamos la contraseña.
 if not check_password():
     st.stop()
-
-# ------------------------------------------------------------------
-# Función de carga desde Google Sheets
-# ------------------------------------------------------------------
-def get_gsheet_data(sheet_name: str) -> pd.DataFrame | None:
-    try:
-        creds_dict = st.secrets["gcp_service_account"]
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
-        credentials = service_account.Credentials.from_service_account_info(
-            creds_dict, scopes=scopes
-        )
-        client = gspread.authorize(credentials)
-        sheet = client.open("TEST TRAZABILIDAD").worksheet(sheet_name)
-        return pd.DataFrame(sheet.get_all_records())
-    except Exception as e:
-        st.error(f"Error al conectar con Google Sheets: {e}")
-        return None
+start_timing("1_Movimientos_por_Cilindro")
 
 # ------------------------------------------------------------------
 # Cargar datos
 # ------------------------------------------------------------------
-df_proceso = get_gsheet_data("PROCESO")
-df_detalle = get_gsheet_data("DETALLE")
-
-# Normalizar columna SERIE en df_detalle
-if df_detalle is not None:
-    df_detalle["SERIE"] = (
-        df_detalle["SERIE"]
-        .astype(str)
-        .str.replace(",", "", regex=False)
-    )
+engine = sync_data()
+refresh_button()
+
+if engine is None:
+    st.stop()
 
 # ------------------------------------------------------------------
 # UI
@@ -50,52 +33,89 @@ if df_detalle is not None:
 st.title("FASTRACK")
 st.subheader("CONSULTA DE MOVIMIENTOS POR CILINDRO")
 
-target_cylinder = st.text_input("Ingrese la ID del cilindro a buscar:")
+modo = st.radio("Tipo de búsqueda", ["Un cilindro", "Varios cilindros"], horizontal=True)
 
-if st.button("Buscar"):
-    if target_cylinder:
-        # Limpiamos el input
-        target_cylinder_normalized = target_cylinder.replace(",", "")
 
-        # 1) Filtrar df_detalle para este cilindro
-        df_det_for_cyl = df_detalle.loc[
-            df_detalle["SERIE"] == target_cylinder_normalized,
-            ["IDPROC", "SERIE", "SERVICIO"]
-        ]
+if modo == "Un cilindro":
+    target_cylinder = st.text_input(
+        "Ingrese la ID del cilindro a buscar:",
+        help="Si la serie no existe se listan las que comienzan con el texto ingresado.",
+    )
+
+    if st.button("Buscar"):
+        if target_cylinder:
+            st.session_state["cilindro_buscado"] = target_cylinder
+        else:
+            st.session_state.pop("cilindro_buscado", None)
+            st.warning("Por favor, ingrese una ID de cilindro.")
+
+    target_cylinder = st.session_state.get("cilindro_buscado")
+
+    if target_cylinder:
+        # Serie exacta o, si no existe, selección entre las que comienzan igual
+        serie, coincidencias = buscar_cilindro(engine, target_cylinder)
+        if serie is None and coincidencias:
+            serie = st.selectbox(
+                f"No existe la serie {target_cylinder}. Series que comienzan con ese texto:",
+                coincidencias,
+            )
 
-        # 2) Filtrar procesos cuyo IDPROC esté en esa lista
-        df_proc_for_cyl = df_proceso[
-            df_proceso["IDPROC"].isin(df_det_for_cyl["IDPROC"])
-        ]
+        # Historial del cilindro desde el índice por SERIE (sólo sus propias filas)
+        df_resultados = historial_cilindro(engine, serie) if serie else None
 
-        if df_proc_for_cyl.empty:
+        if df_resultados is None or df_resultados.empty:
             st.warning("No se encontraron movimientos para el cilindro ingresado.")
         else:
-            # 3) Hacemos merge para unir información de proceso + servicio
-            df_resultados = df_proc_for_cyl.merge(
-                df_det_for_cyl,
-                on="IDPROC",
-                how="left"
-            )
+            st.success(f"Movimientos para el cilindro ID {serie}:")
+            with medir("render", filas=len(df_resultados)):
+                st.dataframe(df_resultados)
 
-            st.success(f"Movimientos para el cilindro ID {target_cylinder}:")
-            st.dataframe(
-                df_resultados[
-                    ["FECHA", "HORA", "IDPROC", "PROCESO", "CLIENTE", "UBICACION", "SERIE", "SERVICIO"]
-                ]
-            )
+            botones_descarga(df_resultados, f"movimientos_{serie}", key="cilindro")
 
-            # ------------------------------------------------------------------
-            # Función compacta para convertir a CSV y luego a bytes
-            # ------------------------------------------------------------------
-            def convert_to_csv(dataframe: pd.DataFrame) -> bytes:
-                return dataframe.to_csv(index=False).encode("utf-8")
-
-            st.download_button(
-                label="⬇️ Descargar resultados en CSV",
-                data=convert_to_csv(df_resultados),
-                file_name=f"movimientos_{target_cylinder}.csv",
-                mime="text/csv",
-            )
-    else:
-        st.warning("Por favor, ingrese una ID de cilindro.")
+else:
+    # ------------------------------------------------------------------
+    # Búsqueda masiva: lista pegada o archivo CSV, resuelta en una pasada
+    # ------------------------------------------------------------------
+    texto_series = st.text_area(
+        "Pegue las series a buscar (una por línea):",
+        help="También se aceptan separadas por espacios o punto y coma.",
+    )
+    archivo = st.file_uploader(
+        "O suba un archivo CSV con las series",
+        type=["csv", "txt"],
+        help="Se usa la columna SERIE si existe; si no, una serie por línea.",
+    )
+
+    if st.button("Buscar cilindros"):
+        series = leer_series(texto_series)
+        if archivo is not None:
+            series += leer_series_csv(archivo.getvalue().decode("utf-8", errors="replace"))
+        if series:
+            st.session_state["cilindros_buscados"] = list(dict.fromkeys(series))
+        else:
+            st.session_state.pop("cilindros_buscados", None)
+            st.warning("Por favor, ingrese al menos una serie.")
+
+    series = st.session_state.get("cilindros_buscados")
+
+    if series:
+        df_historial, df_resumen, no_encontrados = historial_cilindros(engine, series)
+
+        col_total, col_encontrados, col_no = st.columns(3)
+        col_total.metric("Series buscadas", len(series))
+        col_encontrados.metric("Encontradas", len(df_resumen))
+        col_no.metric("No encontradas", len(no_encontrados))
+
+        if not df_resumen.empty:
+            st.write("Último movimiento de cada cilindro")
+            tabla_paginada(engine, df_resumen, ("resumen_cilindros", tuple(series)), key="resumen")
+            botones_descarga(df_resumen, "resumen_cilindros", key="resumen")
+
+            st.write("Historial combinado")
+            tabla_paginada(engine, df_historial, ("historial_cilindros", tuple(series)), key="historial")
+            botones_descarga(df_historial, "movimientos_cilindros", key="historial")
+
+        if no_encontrados:
+            st.warning(f"Series no encontradas ({len(no_encontrados)}): " + ", ".join(no_encontrados))
+
+timing_panel()
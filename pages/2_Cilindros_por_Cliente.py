@@ -1,110 +1,61 @@
+from datetime import date
+
 import streamlit as st
-import gspread
-from google.oauth2 import service_account
-import pandas as pd
 
 # ---------------------------------------------------------------
 # Autenticación simple
 # ---------------------------------------------------------------
 from auth import check_password
+from consultas import cilindros_en_cliente, clientes
+from data import refresh_button, start_timing, sync_data, timing_panel
+from tablas import botones_descarga, tabla_paginada
 if not check_password():
     st.stop()
+start_timing("2_Cilindros_por_Cliente")
 
 # ---------------------------------------------------------------
-# Leer una pestaña de Google Sheets y normalizar columnas
-# ---------------------------------------------------------------
-def get_gsheet_data(sheet: str) -> pd.DataFrame | None:
-    try:
-        creds = st.secrets["gcp_service_account"]
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
-        client = gspread.authorize(
-            service_account.Credentials.from_service_account_info(creds, scopes=scopes)
-        )
-        df = pd.DataFrame(client.open("TEST TRAZABILIDAD").worksheet(sheet).get_all_records())
-        df.columns = df.columns.str.strip().str.upper()
-        return df
-    except Exception as e:
-        st.error(f"Error al conectar con Google Sheets: {e}")
-        return None
-
-# ---------------------------------------------------------------
-# Cargar datos y limpieza mínima
+# Cargar datos (base embebida con los movimientos sincronizados)
 # ---------------------------------------------------------------
-df_proc = get_gsheet_data("PROCESO")
-df_det  = get_gsheet_data("DETALLE")
+engine = sync_data()
+refresh_button()
 
-if df_proc is None or df_det is None:
+if engine is None:
     st.stop()
 
-# — eliminar columnas duplicadas que puedan venir en DETALLE
-dup_cols = [c for c in ["PROCESO", "FECHA", "HORA", "CLIENTE", "UBICACION"] if c in df_det.columns]
-df_det = df_det.drop(columns=dup_cols, errors="ignore")
-
-# — normalizar campos clave
-df_det["SERIE"]  = df_det["SERIE"].astype(str).str.replace(",", "", regex=False)
-df_proc["IDPROC"] = df_proc["IDPROC"].astype(str)
-df_det["IDPROC"]  = df_det["IDPROC"].astype(str)
-
-# ---------------------------------------------------------------
-# Merge trazabilidad completo (cada fila = un movimiento individual)
-# ---------------------------------------------------------------
-df_mov = df_det.merge(
-    df_proc[["IDPROC", "FECHA", "HORA", "PROCESO", "CLIENTE", "UBICACION"]],
-    on="IDPROC",
-    how="left"
-)
-
-# — FECHA_HORA para ordenar (si HORA viene vacía se rellena 00:00:00)
-df_mov["HORA"] = df_mov["HORA"].fillna("00:00:00").astype(str)
-df_mov["FECHA"] = pd.to_datetime(df_mov["FECHA"], errors="coerce", dayfirst=True)
-df_mov["FECHA_HORA"] = pd.to_datetime(
-    df_mov["FECHA"].dt.strftime("%Y-%m-%d") + " " + df_mov["HORA"],
-    errors="coerce"
-)
-
 # ---------------------------------------------------------------
 # Interfaz
 # ---------------------------------------------------------------
 st.title("FASTRACK")
 st.subheader("CONSULTA DE CILINDROS POR CLIENTE")
 
-clientes = df_proc["CLIENTE"].dropna().unique()
-cliente_sel = st.selectbox("Seleccione el cliente:", clientes)
+cliente_sel = st.selectbox("Seleccione el cliente:", clientes(engine))
+fecha_sel = st.date_input("Estado al (vacío = hoy):", value=None, max_value=date.today(), format="DD/MM/YYYY",
+                          help="Cilindros que tenía el cliente al final de ese día")
 
 # ---------------------------------------------------------------
 # Lógica principal
 # ---------------------------------------------------------------
 if st.button("Buscar cilindros del cliente") and cliente_sel:
+    # El cliente y la fecha buscados quedan en la sesión para poder paginar el resultado
+    st.session_state["cliente_buscado"] = cliente_sel
+    st.session_state["cliente_al"] = fecha_sel
 
-    # 1. Último movimiento global de cada cilindro
-    df_ult = (
-        df_mov
-        .sort_values("FECHA_HORA", ascending=False, na_position="last")
-        .drop_duplicates("SERIE", keep="first")
-    )
+cliente_buscado = st.session_state.get("cliente_buscado")
+cliente_al = st.session_state.get("cliente_al")
+if cliente_buscado:
 
-    # 2. Cilindros cuyo último proceso es DESPACHO o ENTREGA
-    df_en_cliente = df_ult[df_ult["PROCESO"].isin(["DESPACHO", "ENTREGA"])]
-
-    # 3. …y cuyo CLIENTE coincide con el seleccionado
-    df_en_cliente = df_en_cliente[df_en_cliente["CLIENTE"] == cliente_sel]
+    # Cilindros cuyo último movimiento (global, hasta la fecha) es DESPACHO o ENTREGA a este cliente
+    df_en_cliente = cilindros_en_cliente(engine, cliente_buscado, al=cliente_al)
+    al_texto = f" al {cliente_al:%d/%m/%Y}" if cliente_al else ""
 
     if not df_en_cliente.empty:
-        st.success(f"Cilindros actualmente en el cliente: {cliente_sel}")
-
-        cols_show = ["SERIE", "IDPROC", "FECHA", "HORA", "PROCESO", "SERVICIO"]
-        cols_show = [c for c in cols_show if c in df_en_cliente.columns]
+        st.success(f"Cilindros {'en' if cliente_al else 'actualmente en'} el cliente: {cliente_buscado}{al_texto}")
 
-        st.dataframe(df_en_cliente[cols_show])
+        tabla_paginada(engine, df_en_cliente, ("cilindros_en_cliente", cliente_buscado, cliente_al), key="cliente")
 
-        st.download_button(
-            "⬇️ Descargar CSV",
-            data=df_en_cliente[cols_show].to_csv(index=False).encode("utf-8"),
-            file_name=f"cilindros_{cliente_sel}.csv",
-            mime="text/csv",
-        )
+        nombre = f"cilindros_{cliente_buscado}" + (f"_al_{cliente_al.isoformat()}" if cliente_al else "")
+        botones_descarga(df_en_cliente, nombre, key="cliente")
     else:
-        st.warning("El cliente no tiene cilindros pendientes de devolución.")
+        st.warning(f"El cliente no tiene cilindros pendientes de devolución{al_texto}.")
+
+timing_panel()
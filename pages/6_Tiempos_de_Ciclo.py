@@ -0,0 +1,56 @@
+import streamlit as st
+
+from auth import check_password
+from consultas import ciclos
+from data import refresh_button, start_timing, sync_data, timing_panel
+from rotacion import DIMENSIONES, resumen_ciclos
+from tablas import botones_descarga, tabla_paginada
+
+if not check_password():
+    st.stop()
+start_timing("6_Tiempos_de_Ciclo")
+
+# Cargar datos (viajes de cada cilindro: salida y siguiente retorno)
+engine = sync_data()
+refresh_button()
+
+if engine is None:
+    st.stop()
+
+st.title("FASTRACK")
+st.subheader("TIEMPOS DE CICLO")
+st.caption("Días entre la salida de un cilindro (DESPACHO/ENTREGA) y su siguiente retorno (RETIRO/RECEPCION).")
+
+if engine.viajes.empty:
+    st.warning("No hay viajes registrados.")
+    st.stop()
+
+# Parámetros del reporte
+col_por, col_fechas = st.columns(2)
+por = col_por.multiselect("Agrupar por", list(DIMENSIONES), default=["CLIENTE"])
+primera, ultima = engine.viajes["SALIDA"].min().date(), engine.viajes["SALIDA"].max().date()
+rango = col_fechas.date_input("Salidas entre", value=(primera, ultima), min_value=primera, max_value=ultima,
+                              format="DD/MM/YYYY")
+desde, hasta = (rango[0], rango[-1]) if rango else (primera, ultima)
+
+df_viajes, df_resumen = ciclos(engine, por=tuple(por), desde=desde, hasta=hasta)
+
+if not df_viajes.empty:
+    total = resumen_ciclos(df_viajes, ()).iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Viajes cerrados", f"{int(total['VIAJES']):,}")
+    col2.metric("Mediana (días)", f"{total['MEDIANA_DIAS']:.1f}")
+    col3.metric("P90 (días)", f"{total['P90_DIAS']:.1f}")
+    col4.metric("Abiertos", f"{int(total['ABIERTOS']):,}")
+
+    st.write("Resumen por " + (", ".join(por) if por else "total"))
+    tabla_paginada(engine, df_resumen, ("ciclos", tuple(por), desde, hasta), key="ciclos")
+    botones_descarga(df_resumen, f"tiempos_de_ciclo_{desde.isoformat()}_a_{hasta.isoformat()}", key="ciclos")
+
+    st.write("Viajes")
+    tabla_paginada(engine, df_viajes, ("viajes", desde, hasta), key="viajes")
+    botones_descarga(df_viajes, f"viajes_{desde.isoformat()}_a_{hasta.isoformat()}", key="viajes")
+else:
+    st.warning("No hay viajes con salida en el rango seleccionado.")
+
+timing_panel()
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import streamlit as st
+
+from auth import check_password
+from consultas import movimientos_por_dia, resumen_flota
+from data import refresh_button, start_timing, sync_data, timing_panel
+from tablas import botones_descarga
+from tiempos import medir
+
+# Valores con más cilindros que se muestran en cada gráfico
+TOP = 20
+# Días de movimientos que se pueden graficar
+PERIODOS = {"30 días": 30, "90 días": 90, "1 año": 365}
+
+if not check_password():
+    st.stop()
+start_timing("7_Resumen_de_Flota")
+
+# Cargar datos (sólo se leen las tablas de resumen de la base embebida)
+engine = sync_data()
+refresh_button()
+
+if engine is None:
+    st.stop()
+
+st.title("FASTRACK")
+st.subheader("RESUMEN DE LA FLOTA")
+
+por_cliente = resumen_flota(engine, "CLIENTE")
+por_ubicacion = resumen_flota(engine, "UBICACION")
+por_servicio = resumen_flota(engine, "SERVICIO")
+ultimos_30 = movimientos_por_dia(engine, date.today() - timedelta(days=29))
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Cilindros", f"{por_servicio['CILINDROS'].sum():,}")
+col2.metric("Entregados a clientes", f"{por_cliente['CILINDROS'].sum():,}")
+col3.metric("Movimientos (30 días)", f"{int(ultimos_30.to_numpy().sum()):,}")
+
+# Cilindros actuales por cliente, ubicación y servicio
+pestanas = st.tabs(["Por cliente", "Por ubicación", "Por servicio"])
+for pestana, (columna, df) in zip(pestanas, [("CLIENTE", por_cliente), ("UBICACION", por_ubicacion),
+                                             ("SERVICIO", por_servicio)]):
+    with pestana:
+        df = df.replace({columna: {"": "(sin dato)"}})
+        if df.empty:
+            st.info("No hay cilindros para mostrar.")
+            continue
+        with medir("render", columna, filas=len(df)):
+            st.bar_chart(df.head(TOP), x=columna, y="CILINDROS", horizontal=True, sort="-CILINDROS")
+            st.dataframe(df, hide_index=True)
+        botones_descarga(df, f"cilindros_por_{columna.lower()}", key=f"resumen_{columna.lower()}")
+
+# Movimientos por día y PROCESO
+st.write("Movimientos por día")
+periodo = st.radio("Período", list(PERIODOS), horizontal=True, label_visibility="collapsed")
+por_dia = movimientos_por_dia(engine, date.today() - timedelta(days=PERIODOS[periodo] - 1))
+if por_dia.empty:
+    st.info("No hay movimientos en el período.")
+else:
+    with medir("render", "movimientos_dia", filas=len(por_dia)):
+        st.bar_chart(por_dia)
+
+timing_panel()
@@ -0,0 +1,44 @@
+import streamlit as st
+
+from auth import check_password
+from consultas import anomalias
+from data import refresh_button, start_timing, sync_data, timing_panel
+from tablas import botones_descarga, tabla_paginada
+from validacion import TIPOS
+
+if not check_password():
+    st.stop()
+start_timing("8_Anomalias")
+
+# Cargar datos (la validación se hace una vez por sincronización, ver validacion.py)
+engine = sync_data()
+refresh_button()
+
+if engine is None:
+    st.stop()
+
+st.title("FASTRACK")
+st.subheader("ANOMALÍAS EN LOS MOVIMIENTOS")
+st.caption(
+    "Movimientos que no siguen el flujo DESPACHO → ENTREGA → RETIRO → RECEPCION, filas de DETALLE "
+    "cuyo IDPROC no existe en PROCESO y PROCESO con FECHA vacía o inválida. Estas filas se siguen "
+    "usando en las consultas; corríjalas en la planilla."
+)
+
+todas = anomalias(engine)
+conteo = todas["TIPO"].value_counts(sort=False)
+
+# Cantidad por tipo
+for columna, tipo in zip(st.columns(len(TIPOS)), TIPOS):
+    columna.metric(tipo, f"{int(conteo.get(tipo, 0)):,}")
+
+if todas.empty:
+    st.success("No se encontraron anomalías.")
+else:
+    tipos = st.multiselect("Tipos", [t for t in TIPOS if conteo.get(t, 0)], placeholder="Todos")
+    df_anomalias = anomalias(engine, tuple(tipos))
+
+    tabla_paginada(engine, df_anomalias, ("anomalias", tuple(tipos)), key="anomalias")
+    botones_descarga(df_anomalias, "anomalias", key="anomalias")
+
+timing_panel()
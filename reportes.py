@@ -0,0 +1,178 @@
+# reportes.py
+"""
+Reportes por lotes desde la línea de comandos, sin abrir la aplicación.
+
+Trabaja sobre la copia local de los datos (la misma que mantiene la app en
+`.cache/`); con `--sync` primero la actualiza desde Google Sheets usando la
+cuenta de servicio de `.streamlit/secrets.toml` (o un JSON con `--credenciales`).
+Cada reporte se escribe en `--salida` como CSV (o en el formato de
+`--formato`: csv.gz, xlsx o parquet, ver `exportar.py`).
+
+    python reportes.py rotacion --umbral 30 --por-cliente
+    python reportes.py clientes                  # cilindros en cada cliente
+    python reportes.py ubicaciones --ubicacion LOCAL
+    python reportes.py clientes --al 2025-03-01   # estado a esa fecha
+    python reportes.py cilindros 12345 67890 --archivo camion.csv
+    python reportes.py fechas --desde 2025-01-01 --hasta 2025-01-31
+    python reportes.py ciclos --por CLIENTE --por MES
+    python reportes.py anomalias
+    python reportes.py --sync rotacion           # actualiza la copia antes
+    python reportes.py --formato xlsx clientes
+"""
+import argparse
+import re
+import sys
+from datetime import datetime, time
+from pathlib import Path
+
+import pandas as pd
+
+import consultas
+import exportar
+from rotacion import DIMENSIONES, TRAMOS
+from sync import CACHE_DIR, SyncEngine, open_spreadsheet
+
+
+def _nombre_archivo(texto: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", str(texto)).strip("_") or "sin_nombre"
+
+
+def _escribir(df: pd.DataFrame, args, nombre: str, index: bool = False) -> None:
+    path = exportar.guardar(df.reset_index() if index else df,
+                            args.salida / _nombre_archivo(nombre), args.formato)
+    print(f"{path}  ({len(df)} filas)")
+
+
+def _engine(args) -> SyncEngine:
+    if not args.sync:
+        return consultas.abrir_copia_local(args.cache)
+    engine = SyncEngine(open_spreadsheet(args.credenciales), cache_dir=args.cache)
+    engine.sync()
+    return engine
+
+
+# ------------------------------------------------------------------
+# Reportes
+# ------------------------------------------------------------------
+def reporte_rotacion(engine: SyncEngine, args) -> None:
+    detalle, resumen = consultas.rotacion(engine, umbral=args.umbral, tramos=args.tramos)
+    _escribir(resumen, args, f"rotacion_resumen_{args.umbral}d", index=True)
+    _escribir(detalle, args, f"rotacion_{args.umbral}d")
+    if args.por_cliente:
+        for cliente, df in detalle.groupby("CLIENTE", observed=True, sort=True):
+            _escribir(df, args, f"rotacion_{args.umbral}d_{cliente}")
+
+
+def _sufijo_al(args) -> str:
+    return f"_al_{args.al.isoformat()}" if args.al else ""
+
+
+def reporte_clientes(engine: SyncEngine, args) -> None:
+    for cliente in args.cliente or consultas.clientes(engine):
+        df = consultas.cilindros_en_cliente(engine, cliente, al=args.al)
+        _escribir(df, args, f"cilindros_{cliente}{_sufijo_al(args)}")
+
+
+def reporte_ubicaciones(engine: SyncEngine, args) -> None:
+    for ubicacion in args.ubicacion or consultas.ubicaciones(engine):
+        df = consultas.cilindros_en_ubicacion(engine, ubicacion, al=args.al)
+        _escribir(df, args, f"Ultimo_Movimiento_{ubicacion}{_sufijo_al(args)}")
+
+
+def reporte_cilindros(engine: SyncEngine, args) -> None:
+    series = list(args.series)
+    if args.archivo:
+        series += consultas.leer_series_csv(args.archivo.read_text(encoding="utf-8"))
+    historial, resumen, no_encontrados = consultas.historial_cilindros(engine, series)
+    _escribir(resumen, args, "resumen_cilindros")
+    _escribir(historial, args, "movimientos_cilindros")
+    if no_encontrados:
+        print(f"Series no encontradas ({len(no_encontrados)}): {', '.join(no_encontrados)}")
+
+
+def reporte_fechas(engine: SyncEngine, args) -> None:
+    desde = datetime.combine(args.desde, time.min)
+    hasta = datetime.combine(args.hasta, time.max)
+    df = consultas.movimientos_por_fecha(engine, desde, hasta)
+    _escribir(df, args, f"movimientos_{args.desde.isoformat()}_a_{args.hasta.isoformat()}")
+
+
+def reporte_ciclos(engine: SyncEngine, args) -> None:
+    por = tuple(args.por or ["CLIENTE"])
+    viajes, resumen = consultas.ciclos(engine, por=por, desde=args.desde, hasta=args.hasta)
+    _escribir(resumen, args, f"tiempos_de_ciclo_{'_'.join(por)}")
+    if args.viajes:
+        _escribir(viajes, args, "viajes")
+
+
+def reporte_anomalias(engine: SyncEngine, args) -> None:
+    df = consultas.anomalias(engine)
+    _escribir(df, args, "anomalias")
+    for tipo, n in df["TIPO"].value_counts(sort=False).items():
+        print(f"  {tipo}: {n}")
+
+
+def _fecha(texto: str):
+    return datetime.strptime(texto, "%Y-%m-%d").date()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cache", type=Path, default=CACHE_DIR, help="copia local de los datos")
+    parser.add_argument("--salida", type=Path, default=Path("reportes"), help="carpeta de salida")
+    parser.add_argument("--sync", action="store_true", help="actualizar desde Google Sheets antes")
+    parser.add_argument("--credenciales", type=Path, help="JSON de la cuenta de servicio")
+    parser.add_argument("--formato", choices=list(exportar.FORMATOS), default="csv",
+                        help="formato de los archivos (por defecto csv)")
+    sub = parser.add_subparsers(dest="reporte", required=True)
+
+    p = sub.add_parser("rotacion", help="cilindros no retornados")
+    p.add_argument("--umbral", type=int, default=30)
+    p.add_argument("--tramos", type=consultas.leer_tramos, default=", ".join(str(t) for t in TRAMOS),
+                   help="límites separados por coma, por ejemplo: 30, 60, 90, 180")
+    p.add_argument("--por-cliente", action="store_true", help="un archivo por cliente")
+    p.set_defaults(fn=reporte_rotacion)
+
+    p = sub.add_parser("clientes", help="cilindros actualmente en cada cliente")
+    p.add_argument("--cliente", action="append", help="sólo este cliente (repetible)")
+    p.add_argument("--al", type=_fecha, help="estado al final de ese día (AAAA-MM-DD); por defecto hoy")
+    p.set_defaults(fn=reporte_clientes)
+
+    p = sub.add_parser("ubicaciones", help="último movimiento de los cilindros en cada ubicación")
+    p.add_argument("--ubicacion", action="append", help="sólo esta ubicación (repetible)")
+    p.add_argument("--al", type=_fecha, help="estado al final de ese día (AAAA-MM-DD); por defecto hoy")
+    p.set_defaults(fn=reporte_ubicaciones)
+
+    p = sub.add_parser("cilindros", help="historial y último movimiento de varios cilindros")
+    p.add_argument("series", nargs="*")
+    p.add_argument("--archivo", type=Path, help="CSV o lista de series (una por línea)")
+    p.set_defaults(fn=reporte_cilindros)
+
+    p = sub.add_parser("fechas", help="movimientos en un rango de fechas")
+    p.add_argument("--desde", type=_fecha, required=True, help="AAAA-MM-DD")
+    p.add_argument("--hasta", type=_fecha, required=True, help="AAAA-MM-DD")
+    p.set_defaults(fn=reporte_fechas)
+
+    p = sub.add_parser("ciclos", help="días entre salida y retorno (mediana y p90)")
+    p.add_argument("--por", action="append", choices=DIMENSIONES, help="agrupar por (repetible; por defecto CLIENTE)")
+    p.add_argument("--desde", type=_fecha, help="salidas desde AAAA-MM-DD")
+    p.add_argument("--hasta", type=_fecha, help="salidas hasta AAAA-MM-DD")
+    p.add_argument("--viajes", action="store_true", help="también la tabla de viajes")
+    p.set_defaults(fn=reporte_ciclos)
+
+    p = sub.add_parser("anomalias", help="movimientos con secuencia, IDPROC o FECHA inválidos")
+    p.set_defaults(fn=reporte_anomalias)
+
+    args = parser.parse_args(argv)
+    try:
+        engine = _engine(args)
+    except (OSError, KeyError) as e:
+        print(f"No se pudieron cargar los datos: {e}", file=sys.stderr)
+        return 1
+    args.salida.mkdir(parents=True, exist_ok=True)
+    args.fn(engine, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
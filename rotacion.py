@@ -0,0 +1,218 @@
+# rotacion.py
+"""
+Motor de rotación: cilindros entregados que no han retornado.
+
+En una sola pasada agrupada (sin ordenar toda la historia) se obtiene, para
+cada SERIE, su última entrega (DESPACHO/ENTREGA) y su último retorno
+(RETIRO/RECEPCION). Esa tabla se construye una vez por versión de los datos;
+luego el reporte de no retornados para cualquier umbral y tramos de
+antigüedad es un filtro vectorizado sobre una fila por cilindro.
+
+Tiempos de ciclo: `viajes` ordena una vez las entregas y retornos por SERIE y
+FECHA_HORA y empareja cada salida con el siguiente retorno del mismo cilindro
+(también una vez por versión); `resumen_ciclos` agrupa esos viajes por
+CLIENTE, SERVICIO y/o mes.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db import ENTREGAS, RETORNOS
+from schema import fecha_hora
+
+# Tramos de antigüedad por defecto (días fuera): 30-59, 60-89, 90-179, 180+
+TRAMOS = (30, 60, 90, 180)
+
+# Columnas del reporte de no retornados
+NO_RETORNO_COLS = ["SERIE", "IDPROC", "FECHA", "PROCESO", "CLIENTE", "SERVICIO", "DIAS_FUERA", "TRAMO"]
+
+# Columnas de la tabla de viajes y dimensiones por las que se resume
+VIAJE_COLS = ["SERIE", "IDPROC", "PROCESO", "CLIENTE", "SERVICIO", "MES", "SALIDA", "RETORNO", "DIAS"]
+DIMENSIONES = ("CLIENTE", "SERVICIO", "MES")
+
+_ENTREGA, _RETORNO = 1, 2
+
+# Movimientos sin filas ni columnas (hojas vacías o sin encabezados)
+_MOVIMIENTOS_VACIO = {
+    "SERIE": "category", "IDPROC": "Int64", "PROCESO": "category", "CLIENTE": "category",
+    "UBICACION": "category", "SERVICIO": "category", "FECHA_HORA": "datetime64[s]",
+}
+
+
+def _movimientos(mov: pd.DataFrame) -> pd.DataFrame:
+    """La tabla tal cual o, si viene sin columnas, una vacía con las columnas tipadas."""
+    if len(mov.columns):
+        return mov
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in _MOVIMIENTOS_VACIO.items()})
+
+
+def _tipos(mov: pd.DataFrame) -> np.ndarray:
+    """`_ENTREGA`, `_RETORNO` o 0 para cada movimiento según su PROCESO."""
+    proceso = mov["PROCESO"]
+    return np.select(
+        [proceso.isin(ENTREGAS).to_numpy(), proceso.isin(RETORNOS).to_numpy()],
+        [_ENTREGA, _RETORNO],
+        default=0,
+    )
+
+
+def ultimas_entregas(df_movimientos: pd.DataFrame, excluidos: np.ndarray | None = None) -> pd.DataFrame:
+    """
+    Una fila por SERIE con los datos de su última entrega y la fecha/hora de
+    su último retorno (`FECHA_RETORNO`, NaT si nunca retornó). Los movimientos
+    marcados en `excluidos` (ver `validacion.validar`) no se consideran.
+    """
+    mov = _movimientos(df_movimientos)
+    tipo = _tipos(mov)
+    ts = fecha_hora(mov)
+    valido = (tipo > 0) & ts.notna().to_numpy()
+    if excluidos is not None:
+        valido &= ~excluidos
+
+    eventos = pd.DataFrame({
+        "SERIE": mov["SERIE"].to_numpy()[valido],
+        "TIPO": tipo[valido],
+        "FECHA_HORA": ts.to_numpy()[valido],
+        "POS": np.flatnonzero(valido),
+    })
+    # Última fila por (SERIE, TIPO): se recorre al revés para que, a igual
+    # FECHA_HORA, gane la fila registrada más tarde.
+    ultimos = eventos.iloc[::-1].groupby(["SERIE", "TIPO"], sort=False)["FECHA_HORA"].idxmax()
+    ultimos = eventos.loc[ultimos.to_numpy()]
+
+    entregas = ultimos[ultimos["TIPO"] == _ENTREGA]
+    retornos = ultimos[ultimos["TIPO"] == _RETORNO].set_index("SERIE")["FECHA_HORA"]
+
+    cols = [c for c in ["SERIE", "IDPROC", "PROCESO", "CLIENTE", "UBICACION", "SERVICIO"] if c in mov.columns]
+    df = mov.iloc[entregas["POS"].to_numpy()][cols].reset_index(drop=True)
+    df["FECHA_ENTREGA"] = entregas["FECHA_HORA"].to_numpy()
+    df["FECHA_RETORNO"] = retornos.reindex(df["SERIE"]).to_numpy()
+    return df
+
+
+def etiquetas_tramos(tramos=TRAMOS) -> list[str]:
+    limites = sorted(set(int(t) for t in tramos))
+    etiquetas = [f"{a}-{b - 1}" for a, b in zip(limites, limites[1:])]
+    return etiquetas + [f"{limites[-1]}+"]
+
+
+def no_retornados(df_entregas: pd.DataFrame, umbral: int = 30, tramos=TRAMOS,
+                  hoy: datetime | None = None) -> pd.DataFrame:
+    """
+    Cilindros cuya última entrega tiene al menos `umbral` días y no registran
+    un retorno posterior, con sus días fuera y tramo de antigüedad.
+    """
+    hoy = pd.Timestamp(hoy or datetime.now())
+    df = df_entregas
+    sin_retorno = df["FECHA_RETORNO"].isna() | (df["FECHA_RETORNO"] < df["FECHA_ENTREGA"])
+    dias = (hoy - df["FECHA_ENTREGA"]).dt.days
+    df = df[sin_retorno & (dias >= umbral)].copy()
+    df["DIAS_FUERA"] = dias[df.index]
+
+    limites = sorted(set(int(t) for t in tramos))
+    # Si el umbral es menor al primer tramo se agrega un tramo inicial
+    if umbral < limites[0]:
+        limites = [max(int(umbral), 0)] + limites
+    df["TRAMO"] = pd.cut(
+        df["DIAS_FUERA"],
+        bins=limites + [np.inf],
+        labels=etiquetas_tramos(limites),
+        right=False,
+    )
+    df["FECHA"] = df["FECHA_ENTREGA"].dt.strftime("%Y-%m-%d")
+    df = df.sort_values("DIAS_FUERA", ascending=False)
+    return df[[c for c in NO_RETORNO_COLS if c in df.columns]].reset_index(drop=True)
+
+
+def resumen_por_cliente(df_no_retornados: pd.DataFrame) -> pd.DataFrame:
+    """Cantidad de cilindros no retornados por CLIENTE y tramo de antigüedad."""
+    resumen = (
+        df_no_retornados
+        .groupby(["CLIENTE", "TRAMO"], observed=False)
+        .size()
+        .unstack(fill_value=0)
+    )
+    resumen["TOTAL"] = resumen.sum(axis=1)
+    return resumen[resumen["TOTAL"] > 0].sort_values("TOTAL", ascending=False)
+
+
+# ------------------------------------------------------------------
+# Tiempos de ciclo
+# ------------------------------------------------------------------
+def viajes(df_movimientos: pd.DataFrame, excluidos: np.ndarray | None = None) -> pd.DataFrame:
+    """
+    Un viaje por salida de cada cilindro: la primera entrega (DESPACHO o
+    ENTREGA) después de su último retorno, emparejada con el siguiente retorno
+    (RETIRO o RECEPCION) de la misma SERIE. Las entregas seguidas sin retorno
+    entre ellas (DESPACHO y luego ENTREGA) son el mismo viaje, que se atribuye
+    al CLIENTE y SERVICIO de la primera. Los viajes sin retorno todavía quedan
+    con `RETORNO` NaT y `DIAS` nulo. Los movimientos marcados en `excluidos`
+    (ver `validacion.validar`) no se consideran.
+    """
+    mov = _movimientos(df_movimientos)
+    tipo = _tipos(mov)
+    ts = fecha_hora(mov)
+    valido = (tipo > 0) & ts.notna().to_numpy() & mov["SERIE"].notna().to_numpy()
+    if excluidos is not None:
+        valido &= ~excluidos
+    pos = np.flatnonzero(valido)
+    serie = pd.factorize(mov["SERIE"].to_numpy()[pos])[0]
+    t = ts.to_numpy()[pos]
+    tipo = tipo[pos]
+
+    # Una sola ordenación: por SERIE, luego FECHA_HORA y, a igual hora, orden de registro
+    orden = np.lexsort((pos, t, serie))
+    pos, serie, t, tipo = pos[orden], serie[orden], t[orden], tipo[orden]
+
+    n = len(pos)
+    misma_serie = np.zeros(n, dtype=bool)
+    misma_serie[1:] = serie[1:] == serie[:-1]
+    anterior_entrega = np.zeros(n, dtype=bool)
+    anterior_entrega[1:] = tipo[:-1] == _ENTREGA
+    salida = (tipo == _ENTREGA) & ~(misma_serie & anterior_entrega)
+
+    # Siguiente retorno de cada evento: mínimo acumulado desde el final
+    retorno = np.where(tipo == _RETORNO, np.arange(n), n)
+    siguiente = np.minimum.accumulate(retorno[::-1])[::-1]
+    i = np.flatnonzero(salida)
+    j = siguiente[i]
+    cerrado = j < n
+    cerrado[cerrado] = serie[j[cerrado]] == serie[i[cerrado]]
+
+    cols = [c for c in ["SERIE", "IDPROC", "PROCESO", "CLIENTE", "SERVICIO"] if c in mov.columns]
+    df = mov.iloc[pos[i]][cols].reset_index(drop=True)
+    df["SALIDA"] = t[i]
+    df["RETORNO"] = pd.Series(t[np.where(cerrado, j, i)]).where(cerrado)
+    df["DIAS"] = (df["RETORNO"] - df["SALIDA"]) / pd.Timedelta(days=1)
+    # Mes de salida como categoría: se da formato sólo a los meses distintos
+    codigos, meses = pd.factorize(t[i].astype("datetime64[M]"), sort=True)
+    df["MES"] = pd.Categorical.from_codes(codigos, pd.DatetimeIndex(meses).strftime("%Y-%m"))
+    return df[[c for c in VIAJE_COLS if c in df.columns]]
+
+
+def resumen_ciclos(df_viajes: pd.DataFrame, por=("CLIENTE",)) -> pd.DataFrame:
+    """
+    Viajes cerrados con su mediana, p90 y promedio de días fuera, y viajes
+    todavía abiertos, por cada combinación de las columnas `por` (de
+    `DIMENSIONES`). Sin columnas, una sola fila con el total.
+    """
+    por = [c for c in por if c in df_viajes.columns]
+    cerrados = df_viajes[df_viajes["DIAS"].notna()]
+    abiertos = df_viajes[df_viajes["DIAS"].isna()]
+    if not por:
+        cerrados = cerrados.assign(_TOTAL="TOTAL")
+        abiertos = abiertos.assign(_TOTAL="TOTAL")
+    grupos = por or ["_TOTAL"]
+    dias = cerrados.groupby(grupos, observed=True, sort=True)["DIAS"]
+    resumen = pd.DataFrame({
+        "VIAJES": dias.size(),
+        "MEDIANA_DIAS": dias.median().round(1),
+        "P90_DIAS": dias.quantile(0.9).round(1),
+        "PROMEDIO_DIAS": dias.mean().round(1),
+    })
+    # Outer: también los grupos que sólo tienen viajes abiertos
+    resumen = resumen.join(abiertos.groupby(grupos, observed=True).size().rename("ABIERTOS"), how="outer")
+    resumen = resumen.fillna({"VIAJES": 0, "ABIERTOS": 0}).astype({"VIAJES": int, "ABIERTOS": int})
+    resumen = resumen.reset_index()
+    return resumen.drop(columns="_TOTAL") if not por else resumen
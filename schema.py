@@ -0,0 +1,127 @@
+# schema.py
+"""
+Esquema tipado único de PROCESO y DETALLE.
+
+Toda la normalización se hace aquí, una sola vez al cargar las hojas, y la
+usan todas las páginas:
+- encabezados sin espacios y en mayúsculas;
+- IDPROC como entero (`Int64`) cuando todos los valores lo son, si no texto;
+- SERIE sin separadores de miles, como categoría;
+- PROCESO, CLIENTE, UBICACION y SERVICIO como categorías;
+- FECHA (dd/mm/aaaa) + HORA en una sola columna datetime64 `FECHA_HORA`.
+
+Las columnas de texto repetidas ocupan un código entero por fila en vez de un
+string, y las uniones por IDPROC comparan enteros.
+"""
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_integer_dtype
+
+FORMATO_FECHA = "%d/%m/%Y"
+FORMATO_FECHA_HORA = "%d/%m/%Y %H:%M:%S"
+
+CATEGORICAS = ["SERIE", "PROCESO", "CLIENTE", "UBICACION", "SERVICIO"]
+
+
+def normalizar_encabezado(header: list) -> list[str]:
+    return [str(c).strip().upper() for c in header]
+
+
+def normalizar_serie(serie: pd.Series) -> pd.Series:
+    """SERIE como texto sin separadores de miles ni espacios."""
+    return serie.astype(str).str.replace(",", "", regex=False).str.strip()
+
+
+def idproc(valores: pd.Series) -> pd.Series:
+    """IDPROC como `Int64` si todos los valores no vacíos son enteros; si no, texto."""
+    texto = valores.astype(str).str.strip()
+    vacio = texto.isna() | (texto == "")
+    numeros = pd.to_numeric(texto.where(~vacio), errors="coerce")
+    if (numeros.notna() | vacio).all() and (numeros.dropna() % 1 == 0).all():
+        return numeros.astype("Int64")
+    return texto.where(~vacio)
+
+
+def fecha_hora(df: pd.DataFrame) -> pd.Series:
+    """
+    FECHA (dd/mm/aaaa) + HORA como datetime64; sin HORA válida queda la fecha.
+    Si la tabla ya trae FECHA_HORA (calculada al cargar) se reutiliza.
+    """
+    if "FECHA_HORA" in df.columns:
+        return df["FECHA_HORA"]
+    fecha_txt = df["FECHA"].astype(str).str.strip()
+    fecha = pd.to_datetime(fecha_txt, format=FORMATO_FECHA, errors="coerce")
+    if "HORA" not in df.columns:
+        return fecha
+    completa = pd.to_datetime(
+        fecha_txt + " " + df["HORA"].astype(str).str.strip(),
+        format=FORMATO_FECHA_HORA,
+        errors="coerce",
+    )
+    return completa.fillna(fecha)
+
+
+def normalizar(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica el esquema a una hoja recién leída (PROCESO o DETALLE)."""
+    df = df.copy()
+    if "IDPROC" in df.columns:
+        df["IDPROC"] = idproc(df["IDPROC"])
+    if "SERIE" in df.columns:
+        df["SERIE"] = normalizar_serie(df["SERIE"])
+    if "FECHA" in df.columns:
+        df["FECHA_HORA"] = fecha_hora(df)
+        df = df.drop(columns=[c for c in ("FECHA", "HORA") if c in df.columns])
+    for col in CATEGORICAS:
+        if col in df.columns:
+            texto = df[col].astype(str).str.strip()
+            df[col] = texto.where(texto != "").astype("category")
+    return df
+
+
+# ------------------------------------------------------------------
+# Tipos compatibles entre tablas
+# ------------------------------------------------------------------
+def idproc_texto(valores: pd.Series | pd.Index) -> pd.Series | pd.Index:
+    """IDPROC como texto (para unir tablas con tipos de IDPROC distintos)."""
+    return valores.astype(str)
+
+
+def alinear(*frames: pd.DataFrame) -> list[pd.DataFrame]:
+    """
+    Deja IDPROC y las columnas categóricas con el mismo tipo en todas las
+    tablas, para que `concat`, `merge` y `reindex` no pierdan los tipos.
+    """
+    frames = list(frames)
+    con_id = [f for f in frames if "IDPROC" in f.columns]
+    if con_id and not all(is_integer_dtype(f["IDPROC"]) for f in con_id):
+        frames = [
+            f.assign(IDPROC=idproc_texto(f["IDPROC"])) if "IDPROC" in f.columns else f
+            for f in frames
+        ]
+    for col in CATEGORICAS:
+        tipos = [f[col].dtype for f in frames if col in f.columns]
+        if not tipos or not all(isinstance(t, CategoricalDtype) for t in tipos):
+            continue
+        union = pd.Index([])
+        for t in tipos:
+            union = union.append(t.categories.difference(union))
+        frames = [
+            f.assign(**{col: f[col].cat.set_categories(union)}) if col in f.columns else f
+            for f in frames
+        ]
+    return frames
+
+
+def concat(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """`pd.concat` que conserva el esquema (ver `alinear`)."""
+    return pd.concat(alinear(*frames), ignore_index=True)
+
+
+# ------------------------------------------------------------------
+# Presentación
+# ------------------------------------------------------------------
+def con_fecha_y_hora(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega FECHA (aaaa-mm-dd) y HORA (hh:mm:ss) en texto desde FECHA_HORA."""
+    return df.assign(
+        FECHA=df["FECHA_HORA"].dt.strftime("%Y-%m-%d"),
+        HORA=df["FECHA_HORA"].dt.strftime("%H:%M:%S"),
+    )
@@ -0,0 +1,33 @@
+# servidor.py
+"""
+Inicia la app con los datos precargados.
+
+Arranca el servidor de Streamlit y, apenas está en marcha, la precarga en
+segundo plano (`data.warm_up`) en el mismo proceso, así el primer usuario ya
+encuentra el cliente autorizado, las hojas cargadas y los índices construidos.
+
+    python servidor.py                       # equivale a: streamlit run App.py
+    python servidor.py --server.port 8080    # acepta las opciones de `streamlit run`
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+from streamlit.runtime import Runtime
+from streamlit.web import cli
+
+
+def _precargar() -> None:
+    # Después de que el servidor leyó su configuración (opciones de la línea de comandos)
+    while not Runtime.exists():
+        time.sleep(0.2)
+    import data
+
+    data.warm_up()
+
+
+if __name__ == "__main__":
+    threading.Thread(target=_precargar, name="fastrack-inicio", daemon=True).start()
+    sys.argv = ["streamlit", "run", str(Path(__file__).parent / "App.py"), *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,305 @@
+# snapshot.py
+"""
+Snapshot de los datos compartido entre procesos de la app.
+
+Con varios procesos de Streamlit (varios workers detrás de un balanceador),
+cada uno mantendría su propia copia de las hojas y consultaría Google Sheets
+por su cuenta. En su lugar, un único proceso sincronizador escribe cada
+versión de los datos en una carpeta compartida:
+
+    <carpeta>/v000042/PROCESO.arrow       hojas normalizadas (Arrow IPC)
+                     /DETALLE.arrow
+                     /MOVIMIENTOS.arrow   DETALLE unido con su PROCESO
+                     /movimientos.sqlite  base embebida con sus índices (`db.py`)
+                     /meta.json
+    <carpeta>/ACTUAL                      nombre de la versión vigente
+
+Una versión se escribe completa en una carpeta temporal y se publica con un
+`rename`; después se reemplaza `ACTUAL`, también con un `rename`. Así un
+lector nunca ve una versión a medio escribir. Los archivos de una versión no
+cambian nunca: los procesos de la app (`SnapshotEngine`) los abren con `mmap`
+de sólo lectura, de modo que las páginas del sistema operativo se comparten
+entre procesos en vez de duplicar los datos en cada uno.
+
+    python snapshot.py --destino /srv/fastrack/snapshots --intervalo 300
+
+La app usa el snapshot en vez de Google Sheets si se define la carpeta en
+`snapshot_dir` de los secrets (o en la variable `FASTRACK_SNAPSHOT_DIR`).
+
+Con un solo proceso, la app también escribe sus propios snapshots en
+`.cache/snapshot` (ver `data.py`): al reiniciar, `restaurar` recupera las
+tablas ya normalizadas y la base sin volver a procesar las filas, y si Google
+Sheets no responde se sirven en modo de sólo lectura con `SnapshotEngine`.
+`meta.json` lleva el número de `FORMATO`: una versión escrita con otro
+formato no se restaura.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow as pa
+
+from db import MovementDB
+from sync import CACHE_DIR, MovementData, SyncEngine, open_spreadsheet
+
+log = logging.getLogger("fastrack.snapshot")
+
+# Versión del formato de los archivos; cambiarla invalida los snapshots existentes
+FORMATO = 2
+PUNTERO = "ACTUAL"
+BASE = "movimientos.sqlite"
+TABLAS = ("PROCESO", "DETALLE", "MOVIMIENTOS")
+# Versiones anteriores que se conservan para lectores que aún no cambian
+CONSERVAR = 3
+# Cada cuánto un proceso de la app revisa si hay una versión nueva
+INTERVALO_LECTURA = 5.0
+# Cada cuánto sincroniza el proceso sincronizador
+INTERVALO_SYNC = 300.0
+
+# Enteros con nulos de vuelta como `Int64` (IDPROC) en vez de float
+_TIPOS = {pa.int64(): pd.Int64Dtype()}
+
+
+# ------------------------------------------------------------------
+# Escritura (proceso sincronizador)
+# ------------------------------------------------------------------
+def _escribir_tabla(df: pd.DataFrame, path: Path) -> None:
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(str(path), "wb") as f, pa.ipc.new_file(f, tabla.schema) as writer:
+        writer.write_table(tabla)
+
+
+def _reemplazar_texto(path: Path, texto: str) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(texto)
+    os.replace(tmp, path)
+
+
+def leer_puntero(carpeta: Path) -> str | None:
+    """Nombre de la versión vigente, o `None` si todavía no hay ninguna."""
+    try:
+        return (Path(carpeta) / PUNTERO).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def escribir(engine: SyncEngine, carpeta: Path, conservar: int = CONSERVAR) -> str:
+    """Publica los datos actuales del motor como una versión nueva; retorna su nombre."""
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    anterior = leer_puntero(carpeta)
+    nombre = f"v{int(anterior[1:]) + 1 if anterior else 1:06d}"
+    tmp = carpeta / f".{nombre}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    # Sin sincronizaciones mientras tanto: tablas, base y cursores de la misma versión
+    with engine._sync_lock:
+        tablas = {
+            "PROCESO": engine.proceso.frame,
+            "DETALLE": engine.detalle.frame,
+            "MOVIMIENTOS": engine.movimientos,
+        }
+        for tabla, df in tablas.items():
+            _escribir_tabla(df, tmp / f"{tabla}.arrow")
+        engine.db.save(tmp / BASE)
+        meta = {
+            "version": nombre,
+            "formato": FORMATO,
+            "creado": datetime.now().isoformat(timespec="seconds"),
+            "modificado": engine.modificado,
+            "filas": {tabla: len(df) for tabla, df in tablas.items()},
+            "hojas": {"PROCESO": engine.proceso.cursor(), "DETALLE": engine.detalle.cursor()},
+        }
+    (tmp / "meta.json").write_text(json.dumps(meta))
+
+    os.replace(tmp, carpeta / nombre)
+    _reemplazar_texto(carpeta / PUNTERO, nombre)
+    _limpiar(carpeta, conservar)
+    return nombre
+
+
+def _limpiar(carpeta: Path, conservar: int) -> None:
+    """
+    Borra las versiones más antiguas. Un proceso que todavía tiene mapeados
+    sus archivos los sigue leyendo sin problema: el sistema libera el espacio
+    recién cuando se cierran.
+    """
+    versiones = sorted(p for p in carpeta.glob("v*") if p.is_dir())
+    for path in versiones[:-conservar]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# ------------------------------------------------------------------
+# Lectura (procesos de la app)
+# ------------------------------------------------------------------
+def _leer_tabla(path: Path) -> pd.DataFrame:
+    # Sin cerrar el mapeo: las columnas del DataFrame pueden apuntar a él
+    tabla = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    return tabla.to_pandas(types_mapper=_TIPOS.get, split_blocks=True)
+
+
+def cargar(path: Path) -> SimpleNamespace:
+    """Abre una versión escrita con `escribir` (sólo lectura)."""
+    path = Path(path)
+    tablas = {tabla: _leer_tabla(path / f"{tabla}.arrow") for tabla in TABLAS}
+    return SimpleNamespace(
+        proceso=SimpleNamespace(frame=tablas["PROCESO"]),
+        detalle=SimpleNamespace(frame=tablas["DETALLE"]),
+        movimientos=tablas["MOVIMIENTOS"],
+        db=MovementDB.open_readonly(path / BASE),
+        meta=json.loads((path / "meta.json").read_text()),
+    )
+
+
+def restaurar(carpeta: Path) -> SimpleNamespace | None:
+    """
+    Datos de la versión vigente de `carpeta` para arrancar un `SyncEngine`
+    (ver su parámetro `inicial`): las hojas y la tabla de movimientos ya
+    normalizadas y una copia modificable de la base. `None` si no hay una
+    versión utilizable (inexistente, de otro `FORMATO` o dañada).
+    """
+    nombre = leer_puntero(carpeta)
+    if nombre is None:
+        return None
+    path = Path(carpeta) / nombre
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+        if meta.get("formato") != FORMATO or "hojas" not in meta:
+            log.info("Snapshot %s con otro formato; se ignora", nombre)
+            return None
+        # Copias en memoria: el motor las modifica al sincronizar
+        tablas = {tabla: pa.ipc.open_file(str(path / f"{tabla}.arrow")).read_all()
+                  .to_pandas(types_mapper=_TIPOS.get) for tabla in TABLAS}
+        base = MovementDB.from_file(path / BASE)
+    except (OSError, ValueError, sqlite3.DatabaseError) as e:
+        log.warning("No se pudo restaurar el snapshot %s: %s", nombre, e)
+        return None
+    return SimpleNamespace(
+        proceso=tablas["PROCESO"],
+        detalle=tablas["DETALLE"],
+        movimientos=tablas["MOVIMIENTOS"],
+        db=base,
+        meta=meta,
+    )
+
+
+class SnapshotEngine(MovementData):
+    """
+    Motor de sólo lectura sobre la versión vigente de una carpeta de
+    snapshots. Expone lo mismo que `SyncEngine` para las páginas y
+    `consultas.py` (`proceso`, `detalle`, `movimientos`, `db`, índices y memo);
+    al aparecer una versión nueva la abre y la reemplaza de una vez.
+    """
+
+    def __init__(self, carpeta: Path, intervalo: float = INTERVALO_LECTURA):
+        super().__init__()
+        self.carpeta = Path(carpeta)
+        self.intervalo = intervalo
+        self.nombre: str | None = None
+        self.last_sync = 0.0
+        self._datos: SimpleNamespace | None = None
+        self._carga_lock = threading.Lock()
+        self.sync(force_full=True)
+        if self._datos is None:
+            raise FileNotFoundError(f"No hay un snapshot de los datos en {self.carpeta}")
+
+    @property
+    def proceso(self) -> SimpleNamespace:
+        return self._datos.proceso
+
+    @property
+    def detalle(self) -> SimpleNamespace:
+        return self._datos.detalle
+
+    @property
+    def movimientos(self) -> pd.DataFrame:
+        return self._datos.movimientos
+
+    @property
+    def db(self) -> MovementDB:
+        return self._datos.db
+
+    @property
+    def meta(self) -> dict:
+        """`meta.json` de la versión abierta (versión, fecha de creación, filas)."""
+        return self._datos.meta
+
+    def sync(self, max_age: float = 0, force_full: bool = False) -> None:
+        """
+        Cambia a la versión vigente si es otra. La revisión es sólo leer
+        `ACTUAL`, así que se hace cada `intervalo` segundos sin importar
+        `max_age` (que se acepta por compatibilidad con `SyncEngine.sync`).
+        """
+        if not force_full and time.time() - self.last_sync < self.intervalo:
+            return
+        self.last_sync = time.time()
+        nombre = leer_puntero(self.carpeta)
+        if nombre is None or nombre == self.nombre:
+            return
+        with self._carga_lock:
+            if nombre == self.nombre:
+                return
+            try:
+                datos = cargar(self.carpeta / nombre)
+            except OSError as e:
+                # Versión borrada o incompleta: se sigue sirviendo la anterior
+                if self._datos is None:
+                    raise
+                log.warning("No se pudo abrir el snapshot %s: %s", nombre, e)
+                return
+            with self._lock:
+                self._datos, self.nombre = datos, nombre
+                self.version += 1
+
+
+# ------------------------------------------------------------------
+# Proceso sincronizador
+# ------------------------------------------------------------------
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--destino", type=Path, required=True, help="carpeta compartida de snapshots")
+    parser.add_argument("--cache", type=Path, default=CACHE_DIR, help="copia local de las hojas")
+    parser.add_argument("--credenciales", type=Path, help="JSON de la cuenta de servicio")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SYNC, help="segundos entre sincronizaciones")
+    parser.add_argument("--conservar", type=int, default=CONSERVAR, help="versiones anteriores a conservar")
+    parser.add_argument("--una-vez", action="store_true", help="sincronizar, publicar y salir")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    try:
+        engine = SyncEngine(open_spreadsheet(args.credenciales), cache_dir=args.cache)
+    except (OSError, KeyError) as e:
+        print(f"No se pudo abrir el spreadsheet: {e}", file=sys.stderr)
+        return 1
+
+    publicada = None
+    while True:
+        try:
+            engine.sync()
+            if engine.version != publicada:
+                nombre = escribir(engine, args.destino, args.conservar)
+                publicada = engine.version
+                log.info("Publicada %s (%d movimientos)", nombre, len(engine.movimientos))
+        except Exception as e:
+            # Se mantiene la última versión publicada y se reintenta en el próximo ciclo
+            log.warning("Error al sincronizar: %s", e)
+            if args.una_vez:
+                return 1
+        if args.una_vez:
+            return 0
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,653 @@
+# sync.py
+"""
+Sincronización incremental de las pestañas PROCESO y DETALLE.
+
+Ambas hojas son registros de movimientos que sólo crecen (append-only). En vez
+de descargar todo el historial en cada recarga se recuerda la última fila
+sincronizada de cada pestaña y sólo se piden las filas nuevas. Cada
+`FULL_RECONCILE_SECONDS` se hace una descarga completa para recoger ediciones
+o filas borradas.
+
+Antes de pedir datos se consulta la fecha de modificación del spreadsheet
+(Drive); si no cambió desde la última sincronización no se pide nada. Además
+cada descarga incremental vuelve a pedir las últimas `SOLAPE` filas ya
+sincronizadas y compara su huella con la guardada: si difieren (una edición o
+un borrado al final de la hoja) esa hoja se descarga completa de inmediato.
+
+La copia local se mantiene en memoria y, opcionalmente, en disco (un archivo
+JSON Lines con las filas más un pequeño archivo con el cursor), de modo que un
+reinicio del proceso no obliga a descargar todo de nuevo. Si además hay un
+snapshot local con el mismo cursor (ver `snapshot.restaurar`), `SyncEngine`
+arranca desde sus tablas ya normalizadas y su base, sin reprocesar las filas.
+"""
+import hashlib
+import json
+import threading
+import time
+import tomllib
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+import schema
+from cuota import Planificador
+from db import MovementDB
+from historico import EstadoHistorico
+from indices import CylinderIndex, DateIndex
+from rotacion import ultimas_entregas, viajes
+from tiempos import medir
+from validacion import validar
+
+SPREADSHEET_NAME = "TEST TRAZABILIDAD"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# Credenciales de la app, usadas también por los scripts fuera de Streamlit
+SECRETS = Path(__file__).parent / ".streamlit" / "secrets.toml"
+
+# Cada cuánto se fuerza una descarga completa para detectar ediciones
+FULL_RECONCILE_SECONDS = 3600
+# Filas ya sincronizadas que se vuelven a pedir para detectar ediciones al final
+SOLAPE = 20
+# Copia en disco de las hojas sincronizadas (sobrevive a reinicios)
+CACHE_DIR = Path(__file__).parent / ".cache"
+# Resultados de consultas memoizados por versión de los datos (ver `MovementData.memo`)
+MEMO_MAX = 64
+# Excluir los movimientos marcados por la validación (transiciones imposibles,
+# PROCESO fuera del flujo) de entregas, viajes, estado actual, histórico y
+# resúmenes. Con False sólo se informan en la página de anomalías.
+EXCLUIR_ANOMALIAS = True
+
+# Columnas que aporta PROCESO a cada movimiento
+PROCESO_COLS = ["IDPROC", "FECHA_HORA", "PROCESO", "CLIENTE", "UBICACION"]
+
+
+def open_spreadsheet(credenciales: Path | None = None):
+    """
+    Spreadsheet real para los scripts que corren fuera de Streamlit, con la
+    cuenta de servicio de `SECRETS` (o de un JSON en `credenciales`).
+    """
+    import gspread
+
+    if credenciales:
+        info = json.loads(Path(credenciales).read_text())
+    else:
+        with SECRETS.open("rb") as f:
+            info = tomllib.load(f)["gcp_service_account"]
+    return gspread.service_account_from_dict(info, scopes=SCOPES).open(SPREADSHEET_NAME)
+
+
+def _clean_rows(rows: list[list], width: int) -> list[list[str]]:
+    """Rellena filas truncadas por la API y descarta las completamente vacías."""
+    cleaned = []
+    for row in rows:
+        if len(row) != width:
+            row = list(row[:width]) + [""] * (width - len(row))
+        if "".join(row).strip():
+            cleaned.append(row)
+    return cleaned
+
+
+def _huella(rows: list[list], width: int) -> str:
+    """Huella de filas crudas (rellenadas al ancho del encabezado)."""
+    rows = [list(r[:width]) + [""] * (width - len(r)) for r in rows]
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode()).hexdigest()
+
+
+def read_grid(rows: list[list[str]], header: list[str]) -> pd.DataFrame:
+    """
+    Construye el DataFrame columna por columna desde la grilla cruda de la API
+    (sin crear un dict por fila como `get_all_records`).
+    """
+    if rows:
+        df = pd.DataFrame(dict(enumerate(zip(*rows))))
+        df.columns = header
+        return df
+    return pd.DataFrame(columns=header, dtype=str)
+
+
+def parse_values(rows: list[list[str]], header: list[str]) -> pd.DataFrame:
+    """Grilla cruda -> DataFrame con el esquema tipado (ver `schema.py`)."""
+    with medir("parse", filas=len(rows)):
+        df = read_grid(rows, header)
+    with medir("normalize", filas=len(rows)):
+        return schema.normalizar(df)
+
+
+def _join(lookup: pd.DataFrame, df_det: pd.DataFrame) -> pd.DataFrame:
+    """Une filas de DETALLE con los datos de su PROCESO (left join por IDPROC)."""
+    det = df_det.drop(columns=[c for c in lookup.columns if c in df_det.columns])
+    proc = lookup.reindex(det["IDPROC"])
+    proc.index = det.index
+    return pd.concat([det, proc], axis=1)
+
+
+def _tipos_compatibles(*tablas: pd.DataFrame) -> bool:
+    """False si IDPROC cambió de tipo (p. ej. llegó un IDPROC no numérico)."""
+    return len({t["IDPROC"].dtype for t in tablas if "IDPROC" in t.columns}) == 1
+
+
+class SheetSync:
+    """
+    Copia local de una pestaña append-only, actualizada por rangos de filas.
+    No pide datos por su cuenta: `SyncEngine` pide los rangos de ambas hojas
+    en una sola llamada, a través del planificador, y los incorpora en tres
+    pasos: `leer` (la hoja resultante, sin tocar la copia), `adoptar` (el
+    cambio de referencias) y `guardar` (la copia en disco).
+    """
+
+    def __init__(self, worksheet, cache_dir: Path | None = None,
+                 full_every: float = FULL_RECONCILE_SECONDS,
+                 inicial: tuple[pd.DataFrame, dict] | None = None):
+        self.title = worksheet.title
+        self.full_every = full_every
+        self.header: list[str] = []
+        self.frame = pd.DataFrame()
+        self.last_row = 1      # última fila de la hoja ya leída (1 = encabezado)
+        self.last_full = 0.0   # timestamp de la última descarga completa
+        self.tail_hash = ""    # huella de las últimas `SOLAPE` filas leídas
+        self.restaurada = False  # True si la hoja se tomó de `inicial` (ver `_restaurar`)
+        self._rows_path = self._meta_path = None
+        if cache_dir is not None:
+            cache_dir = Path(cache_dir)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self._rows_path = cache_dir / f"{self.title}.rows.jsonl"
+            self._meta_path = cache_dir / f"{self.title}.meta.json"
+            self.restaurada = inicial is not None and self._restaurar(*inicial)
+            if not self.restaurada:
+                self._load()
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+    def needs_full(self, force_full: bool = False) -> bool:
+        """True si la próxima sincronización debe descargar la hoja completa."""
+        return force_full or not self.header or time.time() - self.last_full >= self.full_every
+
+    def _overlap(self, last_row: int | None = None) -> int:
+        """Filas ya leídas que se vuelven a pedir en la descarga incremental."""
+        return min(SOLAPE, (self.last_row if last_row is None else last_row) - 1)
+
+    def _tail_range(self) -> str:
+        last_col = rowcol_to_a1(1, len(self.header))[:-1]
+        return f"A{self.last_row + 1 - self._overlap()}:{last_col}"
+
+    def _tail(self, values: list[list[str]], last_row: int, width: int) -> str:
+        """Huella de las filas que se volverán a pedir después de leer hasta `last_row`."""
+        return _huella(values[len(values) - self._overlap(last_row):], width)
+
+    def tail_matches(self, values: list[list[str]]) -> bool:
+        """
+        True si las filas ya sincronizadas al comienzo de una descarga
+        incremental no cambiaron (si no, hay que descargar la hoja completa).
+        """
+        return _huella(values[:self._overlap()], len(self.header)) == self.tail_hash
+
+    def fetch_range(self, full: bool) -> str:
+        """Rango A1 (con el nombre de la hoja) a pedir en la próxima sincronización."""
+        return absolute_range_name(self.title, None if full else self._tail_range())
+
+    def leer(self, values: list[list[str]], full: bool) -> SimpleNamespace:
+        """
+        Hoja resultante de incorporar los valores crudos pedidos con
+        `fetch_range(full)`, sin modificar la copia (ver `adoptar`): `frame`
+        completo, `nuevas` filas (la hoja entera si `full`), `rows` crudas
+        para el disco y el cursor nuevo.
+        """
+        if full:
+            header = schema.normalizar_encabezado(values[0]) if values else []
+            rows = _clean_rows(values[1:], len(header))
+            frame = parse_values(rows, header)
+            last_row = len(values) if values else 1
+            return SimpleNamespace(full=True, header=header, frame=frame, nuevas=frame, rows=rows,
+                                   last_row=last_row, last_full=time.time(),
+                                   tail_hash=self._tail(values, last_row, len(header)))
+
+        nuevas = values[self._overlap():]
+        cambio = SimpleNamespace(full=False, header=self.header, frame=self.frame, nuevas=self.frame.iloc[0:0],
+                                 rows=[], last_row=self.last_row, last_full=self.last_full,
+                                 tail_hash=self.tail_hash)
+        if not nuevas:
+            return cambio
+
+        cambio.rows = _clean_rows(nuevas, len(self.header))
+        cambio.last_row += len(nuevas)
+        cambio.tail_hash = self._tail(values, cambio.last_row, len(self.header))
+        frame, cambio.nuevas = schema.alinear(self.frame, parse_values(cambio.rows, self.header))
+        cambio.frame = pd.concat([frame, cambio.nuevas], ignore_index=True)
+        return cambio
+
+    def adoptar(self, cambio: SimpleNamespace) -> None:
+        """Reemplaza la copia por la hoja leída con `leer` (sólo asigna referencias)."""
+        self.header, self.frame = cambio.header, cambio.frame
+        self.last_row, self.last_full, self.tail_hash = cambio.last_row, cambio.last_full, cambio.tail_hash
+
+    def guardar(self, cambio: SimpleNamespace) -> None:
+        """Lleva a la copia en disco un cambio ya adoptado."""
+        if cambio.full:
+            self._rewrite(cambio.rows)
+        elif cambio.rows:
+            self._append(cambio.rows)
+
+    # ------------------------------------------------------------------
+    # Persistencia en disco
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        if not (self._meta_path.exists() and self._rows_path.exists()):
+            return
+        try:
+            meta = json.loads(self._meta_path.read_text())
+            with self._rows_path.open(encoding="utf-8") as f:
+                # Sólo se confía en las filas registradas en el cursor
+                rows = [json.loads(line) for _, line in zip(range(meta["n_rows"]), f)]
+        except (OSError, ValueError, KeyError):
+            return
+        if len(rows) != meta["n_rows"]:
+            return
+        self.header = meta["header"]
+        self.last_row = meta["last_row"]
+        self.last_full = meta["last_full"]
+        self.tail_hash = meta.get("tail_hash", "")
+        self.frame = parse_values(rows, self.header)
+
+    def _restaurar(self, frame: pd.DataFrame, cursor: dict | None) -> bool:
+        """
+        Toma la hoja ya normalizada de un snapshot local (ver
+        `snapshot.restaurar`) en vez de releer las filas en JSON, sólo si su
+        cursor es el mismo que el de la copia en disco: así las filas que se
+        agreguen después siguen coincidiendo con el archivo de filas.
+        """
+        try:
+            meta = json.loads(self._meta_path.read_text())
+        except (OSError, ValueError):
+            return False
+        if cursor != meta or len(frame) != meta.get("n_rows"):
+            return False
+        self.header = meta["header"]
+        self.last_row = meta["last_row"]
+        self.last_full = meta["last_full"]
+        self.tail_hash = meta.get("tail_hash", "")
+        self.frame = frame
+        return True
+
+    def cursor(self) -> dict:
+        """Cursor de la copia (el mismo que se guarda junto al archivo de filas)."""
+        return {
+            "header": self.header,
+            "last_row": self.last_row,
+            "last_full": self.last_full,
+            "tail_hash": self.tail_hash,
+            "n_rows": len(self.frame),
+        }
+
+    def _write_meta(self) -> None:
+        self._meta_path.write_text(json.dumps(self.cursor()))
+
+    def _rewrite(self, rows: list[list[str]]) -> None:
+        if self._rows_path is None:
+            return
+        with self._rows_path.open("w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        self._write_meta()
+
+    def _append(self, rows: list[list[str]]) -> None:
+        if self._rows_path is None:
+            return
+        with self._rows_path.open("a", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        self._write_meta()
+
+
+class OfflineSpreadsheet:
+    """
+    Reemplazo sin conexión del spreadsheet: sólo aporta los nombres de las
+    hojas para abrir la copia en disco. Cualquier sincronización falla.
+    """
+    title = SPREADSHEET_NAME
+
+    def worksheet(self, title: str) -> SimpleNamespace:
+        return SimpleNamespace(title=title)
+
+    def values_batch_get(self, ranges: list[str], params: dict | None = None) -> dict:
+        raise ConnectionError("Copia local de los datos, sin conexión a Google Sheets")
+
+
+class MovementData:
+    """
+    Estructuras derivadas (índices, entregas, viajes, anomalías, histórico) y memo de consultas sobre
+    `proceso.frame` y `movimientos`, reconstruidas una sola vez por `version`.
+    La comparten el motor que sincroniza (`SyncEngine`) y el que lee un
+    snapshot compartido (`snapshot.SnapshotEngine`).
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._derivados: dict[str, tuple[int, object]] = {}
+        self._memo: OrderedDict[tuple, object] = OrderedDict()
+        self._memo_version = 0
+        self._lock = threading.Lock()
+        self._memo_lock = threading.Lock()
+
+    def _derivado(self, nombre: str, construir):
+        """Estructura derivada de los datos, construida una sola vez por versión."""
+        with self._lock:
+            return self._construir(nombre, construir)
+
+    def _construir(self, nombre: str, construir):
+        """`_derivado` ya bajo `_lock` (para una estructura que depende de otra)."""
+        version, valor = self._derivados.get(nombre, (-1, None))
+        if version != self.version:
+            with medir("index", nombre):
+                valor = construir()
+            self._derivados[nombre] = (self.version, valor)
+        return valor
+
+    def _excluidos(self) -> np.ndarray | None:
+        """Movimientos que no cuentan (ver `EXCLUIR_ANOMALIAS`); se llama bajo `_lock`."""
+        if not EXCLUIR_ANOMALIAS:
+            return None
+        return self._construir("validacion", lambda: validar(self.proceso.frame, self.movimientos)).excluidos
+
+    def memo(self, clave: tuple, construir):
+        """
+        Resultado de una consulta memoizado por (versión de los datos, `clave`).
+        Al cambiar la versión se descartan los resultados anteriores y se
+        guardan a lo más `MEMO_MAX`, descartando los usados hace más tiempo.
+        El cálculo se hace fuera del lock, así una consulta lenta no bloquea a
+        las demás sesiones. Los resultados se comparten: no deben modificarse.
+        """
+        version = self.version
+        with self._memo_lock:
+            if self._memo_version != version:
+                self._memo.clear()
+                self._memo_version = version
+            if clave in self._memo:
+                self._memo.move_to_end(clave)
+                return self._memo[clave]
+        valor = construir()
+        with self._memo_lock:
+            if self._memo_version == version:
+                self._memo[clave] = valor
+                while len(self._memo) > MEMO_MAX:
+                    self._memo.popitem(last=False)
+        return valor
+
+    @property
+    def indice(self) -> CylinderIndex:
+        """Índice por SERIE e IDPROC (ver `indices.py`)."""
+        return self._derivado("indice", lambda: CylinderIndex(self.proceso.frame, self.movimientos))
+
+    @property
+    def fechas(self) -> DateIndex:
+        """PROCESO ordenado por FECHA_HORA para consultas por rango (ver `indices.py`)."""
+        return self._derivado("fechas", lambda: DateIndex(self.proceso.frame, self.movimientos))
+
+    @property
+    def validacion(self) -> SimpleNamespace:
+        """
+        Anomalías y movimientos excluidos (ver `validacion.validar`). Al
+        sincronizar se calcula junto con los datos nuevos (ver `SyncEngine._merge`).
+        """
+        return self._derivado("validacion", lambda: validar(self.proceso.frame, self.movimientos))
+
+    @property
+    def entregas(self) -> pd.DataFrame:
+        """Última entrega y último retorno de cada SERIE (ver `rotacion.py`)."""
+        return self._derivado("entregas", lambda: ultimas_entregas(self.movimientos, self._excluidos()))
+
+    @property
+    def viajes(self) -> pd.DataFrame:
+        """Viajes (salida y siguiente retorno) de cada SERIE (ver `rotacion.py`)."""
+        return self._derivado("viajes", lambda: viajes(self.movimientos, self._excluidos()))
+
+    @property
+    def anomalias(self) -> pd.DataFrame:
+        """Movimientos y PROCESO con problemas de secuencia, IDPROC o FECHA (ver `validacion.py`)."""
+        return self.validacion.anomalias
+
+    @property
+    def historico(self) -> EstadoHistorico:
+        """Registro de eventos con puntos de control para el estado a una fecha (ver `historico.py`)."""
+        return self._derivado("historico", lambda: EstadoHistorico(self.movimientos, excluidos=self._excluidos()))
+
+
+class SyncEngine(MovementData):
+    """
+    Mantiene PROCESO, DETALLE y la tabla de movimientos unida (DETALLE + datos
+    de su PROCESO), re-derivando sólo las filas afectadas por cada sincronización.
+    Las filas también se cargan en la base embebida `db` (ver `db.py`).
+    """
+
+    def __init__(self, spreadsheet, cache_dir: Path | None = None,
+                 full_every: float = FULL_RECONCILE_SECONDS,
+                 planificador: Planificador | None = None,
+                 inicial: SimpleNamespace | None = None):
+        """
+        `inicial` (ver `snapshot.restaurar`) trae las hojas normalizadas, la
+        tabla de movimientos y la base de un snapshot local: si coincide con
+        la copia en disco de `cache_dir` se arranca desde ahí, sin volver a
+        leer, normalizar ni cargar las filas.
+        """
+        super().__init__()
+        self.spreadsheet = spreadsheet
+        self.planificador = planificador or Planificador()
+        cursores = inicial.meta.get("hojas", {}) if inicial else {}
+        self.proceso, self.detalle = [
+            SheetSync(spreadsheet.worksheet(hoja), cache_dir, full_every,
+                      inicial=(getattr(inicial, hoja.lower()), cursores.get(hoja)) if inicial else None)
+            for hoja in ("PROCESO", "DETALLE")
+        ]
+        self.movimientos = pd.DataFrame()
+        self.db = MovementDB()
+        self.last_sync = 0.0
+        self.modificado: str | None = None  # fecha de modificación en la última sincronización
+        self._proc_lookup = pd.DataFrame()
+        self._huerfanas = pd.Index([])  # filas de DETALLE sin PROCESO todavía
+        self._sync_lock = threading.Lock()
+        if self.proceso.restaurada and self.detalle.restaurada:
+            with medir("restore", "snapshot", filas=len(inicial.movimientos)):
+                self.movimientos, self.db = inicial.movimientos, inicial.db
+                self.modificado = inicial.meta.get("modificado")
+                if "IDPROC" in self.proceso.frame.columns and not self.movimientos.empty:
+                    self._proc_lookup = self._lookup(self.proceso.frame)
+                    self._huerfanas = self.movimientos.index[
+                        ~self.movimientos["IDPROC"].isin(self._proc_lookup.index)]
+        elif not self.proceso.frame.empty or not self.detalle.frame.empty:
+            estado = self._completo(self.proceso.frame, self.detalle.frame)
+            estado.cambio = False  # la versión inicial ya corresponde a la copia en disco
+            self._adoptar(estado)
+
+    @classmethod
+    def offline(cls, cache_dir: Path = CACHE_DIR) -> "SyncEngine":
+        """Motor sobre la copia en disco, sin credenciales ni conexión."""
+        return cls(OfflineSpreadsheet(), cache_dir=cache_dir, full_every=float("inf"))
+
+    def sync(self, max_age: float = 0, force_full: bool = False) -> None:
+        """
+        Sincroniza si pasaron más de `max_age` segundos desde la última vez.
+
+        Hay una sola sincronización en curso a la vez: si ya hay datos, las
+        sesiones que llegan mientras otra sincroniza no la esperan y siguen
+        con los datos actuales. Las peticiones, la normalización, la unión y
+        la carga de una base nueva se hacen fuera de `_lock`, sobre copias;
+        bajo `_lock` sólo se cambian las referencias (y, en una sincronización
+        incremental, se agregan las filas nuevas a la base), así las consultas
+        no se bloquean ni durante una descarga completa. Si algo falla (p. ej.
+        `cuota.SinCuota`) los datos quedan como estaban.
+        """
+        if not force_full and time.time() - self.last_sync < max_age:
+            return
+        if not self._sync_lock.acquire(blocking=force_full or self.movimientos.empty):
+            return
+        try:
+            if not force_full and time.time() - self.last_sync < max_age:
+                return
+            modificado = self._probe()
+            if not force_full and modificado is not None and modificado == self.modificado:
+                self.last_sync = time.time()
+                return
+            values, fulls = self._fetch(force_full)
+            hojas = (self.proceso, self.detalle)
+            cambios = [h.leer(v, full) for h, v, full in zip(hojas, values, fulls)]
+            estado = self._merge(*cambios)
+            with self._lock:
+                for hoja, cambio in zip(hojas, cambios):
+                    hoja.adoptar(cambio)
+                self._adoptar(estado)
+                self.last_sync = time.time()
+                self.modificado = modificado
+            for hoja, cambio in zip(hojas, cambios):
+                hoja.guardar(cambio)
+        finally:
+            self._sync_lock.release()
+
+    def _merge(self, proc: SimpleNamespace, det: SimpleNamespace) -> SimpleNamespace:
+        """
+        Datos derivados de las hojas leídas (`SheetSync.leer`), sin modificar
+        los actuales, con la validación de la tabla de movimientos resultante.
+        """
+        if proc.full or det.full or self.movimientos.empty or not _tipos_compatibles(
+                proc.frame, det.frame, self.movimientos):
+            return self._completo(proc.frame, det.frame)
+        with medir("merge", "incremental", filas=len(det.nuevas)):
+            estado = self._incremental(proc.nuevas, det.nuevas)
+        estado.validacion = self._validar(proc.frame, estado.movimientos)
+        anteriores = self.validacion.excluidos
+        if EXCLUIR_ANOMALIAS and (estado.validacion.excluidos[:len(anteriores)] != anteriores).any():
+            # Un movimiento atrasado cambió qué filas ya cargadas se excluyen: la
+            # base se vuelve a cargar completa
+            return self._completo(proc.frame, det.frame)
+        estado.cambio = not proc.nuevas.empty or not det.nuevas.empty
+        return estado
+
+    def _validar(self, df_proc: pd.DataFrame, movimientos: pd.DataFrame) -> SimpleNamespace:
+        with medir("validacion", "anomalias", filas=len(movimientos)):
+            return validar(df_proc, movimientos)
+
+    def _adoptar(self, estado: SimpleNamespace) -> None:
+        """Cambia a los datos derivados por `_merge` (bajo `_lock` si ya hay lectores)."""
+        if estado.db is None:
+            excluidos = estado.validacion.excluidos[len(estado.movimientos) - len(estado.nuevas_det):]
+            with medir("db", "append", filas=len(estado.nuevas_det)):
+                self.db.append(estado.nuevas_proc, estado.nuevas_det, excluidos if EXCLUIR_ANOMALIAS else None)
+        else:
+            self.db = estado.db
+        if estado.proceso is not None:
+            self.proceso.frame, self.detalle.frame = estado.proceso, estado.detalle
+        self.movimientos = estado.movimientos
+        self._proc_lookup, self._huerfanas = estado.lookup, estado.huerfanas
+        if estado.cambio:
+            self.version += 1
+        self._derivados["validacion"] = (self.version, estado.validacion)
+
+    def _probe(self) -> str | None:
+        """
+        Fecha de modificación del spreadsheet según Drive (una petición sólo de
+        metadatos). `None` si el spreadsheet no la informa o la consulta falla;
+        en ese caso se sincroniza igual.
+        """
+        leer = getattr(self.spreadsheet, "get_lastUpdateTime", None)
+        if leer is None:
+            return None
+        try:
+            with medir("probe", "modifiedTime"):
+                # Sin reintentos: si falla se sincroniza igual
+                return self.planificador.ejecutar("modifiedTime", leer, reintentos=0)
+        except Exception:
+            return None
+
+    def _batch_get(self, hojas: list[SheetSync], fulls: list[bool]) -> list[list[list[str]]]:
+        rangos = [h.fetch_range(full) for h, full in zip(hojas, fulls)]
+        with medir("fetch", "completo" if all(fulls) else "incremental") as info:
+            response = self.planificador.ejecutar(
+                ("values:batchGet", tuple(rangos)), lambda: self.spreadsheet.values_batch_get(rangos)
+            )
+            values = [vr.get("values", []) for vr in response.get("valueRanges", [])]
+            info["filas"] = sum(len(v) for v in values)
+        return values
+
+    def _fetch(self, force_full: bool) -> tuple[list[list[list[str]]], list[bool]]:
+        """
+        Pide PROCESO y DETALLE en una sola llamada `values:batchGet`. Una hoja
+        cuyas últimas filas ya sincronizadas cambiaron se vuelve a pedir
+        completa. Retorna los valores crudos y si cada hoja vino completa.
+        """
+        hojas = [self.proceso, self.detalle]
+        fulls = [h.needs_full(force_full) for h in hojas]
+        values = self._batch_get(hojas, fulls)
+        editadas = [i for i, h in enumerate(hojas) if not fulls[i] and not h.tail_matches(values[i])]
+        if editadas:
+            completas = self._batch_get([hojas[i] for i in editadas], [True] * len(editadas))
+            for i, v in zip(editadas, completas):
+                values[i], fulls[i] = v, True
+        return values, fulls
+
+    # ------------------------------------------------------------------
+    # Derivación de la tabla de movimientos
+    # ------------------------------------------------------------------
+    def _lookup(self, df_proc: pd.DataFrame) -> pd.DataFrame:
+        cols = [c for c in PROCESO_COLS if c in df_proc.columns]
+        lookup = df_proc[cols]
+        return lookup.drop_duplicates("IDPROC", keep="last").set_index("IDPROC")
+
+    def _unir(self, df_proc: pd.DataFrame, df_det: pd.DataFrame) -> SimpleNamespace:
+        """Tabla de movimientos desde las hojas completas (sin la base)."""
+        estado = SimpleNamespace(proceso=df_proc, detalle=df_det, movimientos=pd.DataFrame(),
+                                 lookup=pd.DataFrame(), huerfanas=pd.Index([]), cambio=True)
+        if "IDPROC" in df_proc.columns and "IDPROC" in df_det.columns:
+            estado.proceso, estado.detalle = schema.alinear(df_proc, df_det)
+            estado.lookup = self._lookup(estado.proceso)
+            estado.movimientos = _join(estado.lookup, estado.detalle.reset_index(drop=True))
+            estado.huerfanas = estado.movimientos.index[~estado.movimientos["IDPROC"].isin(estado.lookup.index)]
+        return estado
+
+    def _completo(self, df_proc: pd.DataFrame, df_det: pd.DataFrame) -> SimpleNamespace:
+        """Tabla de movimientos y base nuevas desde las hojas completas."""
+        with medir("merge", "completo") as info:
+            estado = self._unir(df_proc, df_det)
+            info["filas"] = len(estado.movimientos)
+        estado.validacion = self._validar(estado.proceso, estado.movimientos)
+        with medir("db", "load", filas=len(estado.detalle)):
+            estado.db = MovementDB()
+            estado.db.load(estado.proceso, estado.detalle,
+                           estado.validacion.excluidos if EXCLUIR_ANOMALIAS else None)
+        return estado
+
+    def _incremental(self, new_proc: pd.DataFrame, new_det: pd.DataFrame) -> SimpleNamespace:
+        """
+        Tabla de movimientos con las filas nuevas. Parte de la actual sin
+        modificarla: las sesiones la siguen leyendo hasta `_adoptar`.
+        """
+        lookup, movimientos, huerfanas = self._proc_lookup, self.movimientos, self._huerfanas
+
+        # 1) Procesos nuevos: sólo pueden completar filas de DETALLE huérfanas
+        if not new_proc.empty:
+            nuevos = self._lookup(new_proc)
+            lookup = pd.concat(schema.alinear(lookup, nuevos))
+            lookup = lookup[~lookup.index.duplicated(keep="last")]
+            if len(huerfanas):
+                resueltas = huerfanas[movimientos.loc[huerfanas, "IDPROC"].isin(nuevos.index).to_numpy()]
+                if len(resueltas):
+                    valores = lookup.reindex(movimientos.loc[resueltas, "IDPROC"])
+                    movimientos, valores = schema.alinear(movimientos, valores)
+                    movimientos = movimientos.copy()
+                    for col in valores.columns:
+                        movimientos.loc[resueltas, col] = valores[col].to_numpy()
+                    huerfanas = huerfanas.difference(resueltas)
+
+        # 2) Filas nuevas de DETALLE: se unen y se agregan al final
+        if not new_det.empty:
+            start = len(movimientos)
+            nuevas = _join(lookup, new_det.reset_index(drop=True))
+            nuevas.index = pd.RangeIndex(start, start + len(nuevas))
+            movimientos = schema.concat([movimientos, nuevas])
+            huerfanas = huerfanas.append(nuevas.index[~nuevas["IDPROC"].isin(lookup.index)])
+
+        return SimpleNamespace(proceso=None, detalle=None, movimientos=movimientos, lookup=lookup,
+                               huerfanas=huerfanas, db=None, nuevas_proc=new_proc, nuevas_det=new_det)
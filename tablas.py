@@ -0,0 +1,197 @@
+# tablas.py
+"""
+Tablas de resultados paginadas en el servidor.
+
+Los listados grandes (un mes de movimientos, todos los cilindros de un
+cliente) no se envían completos al navegador: el filtro, el orden y el corte
+de la página se hacen en el servidor sobre el resultado ya calculado, y sólo
+la página visible llega a `st.dataframe`. Sobre la tabla se muestra cuántas
+filas hay por PROCESO, CLIENTE y UBICACION en el resultado filtrado.
+
+El resultado filtrado y ordenado, y sus totales, se memoizan en el motor
+(`MovementData.memo`) por (consulta, resultado, filtros, orden): cambiar de
+página sólo corta filas. El resultado se identifica por el objeto mismo (ver
+`_memo_tabla`), así una consulta que cambia sin que cambie la versión de los
+datos (p. ej. la rotación al pasar los días) no muestra una vista anterior.
+
+`botones_descarga` ofrece el resultado en CSV comprimido, Excel y Parquet;
+cada archivo se genera recién cuando se hace clic (ver `exportar.py`).
+"""
+import contextvars
+import math
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+
+import tiempos
+from exportar import FORMATOS, exportar
+from tiempos import medir
+
+# Columnas con totales sobre la tabla (y filtro por valor)
+RESUMEN_COLS = ["PROCESO", "CLIENTE", "UBICACION"]
+# Filas por página disponibles
+TAMANOS = (50, 100, 500, 1000)
+# Valores con más filas que se muestran en cada total
+TOP = 10
+
+SIN_ORDEN = "(orden de la consulta)"
+
+# Formatos ofrecidos para descargar, con su etiqueta
+DESCARGAS = {"xlsx": "Excel", "csv.gz": "CSV comprimido", "parquet": "Parquet"}
+
+
+# ------------------------------------------------------------------
+# Filtro, orden y corte (sin Streamlit)
+# ------------------------------------------------------------------
+def filtrar(df: pd.DataFrame, filtros: dict[str, list], serie: str = "") -> pd.DataFrame:
+    """Filas cuyos valores están en `filtros[col]` y cuya SERIE comienza con `serie`."""
+    mascara = pd.Series(True, index=df.index)
+    for col, valores in filtros.items():
+        if valores and col in df.columns:
+            mascara &= df[col].isin(valores)
+    if serie and "SERIE" in df.columns:
+        mascara &= df["SERIE"].astype(str).str.startswith(serie, na=False)
+    return df if mascara.all() else df[mascara]
+
+
+def _clave_orden(s: pd.Series) -> pd.Series:
+    """Texto como texto y números guardados como texto (IDPROC, SERIE) como números."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(str).where(s.notna())
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    numeros = pd.to_numeric(s, errors="coerce")
+    return numeros if numeros.notna().sum() == s.notna().sum() else s
+
+
+def ordenar(df: pd.DataFrame, columna: str | None, descendente: bool = False) -> pd.DataFrame:
+    if not columna or columna not in df.columns:
+        return df
+    return df.sort_values(columna, ascending=not descendente, key=_clave_orden,
+                          kind="stable", na_position="last")
+
+
+def resumen(df: pd.DataFrame, columna: str) -> pd.DataFrame:
+    """Filas por valor de `columna`, de más a menos."""
+    conteo = df[columna].value_counts(sort=True, dropna=True)
+    conteo = conteo[conteo > 0]
+    return conteo.rename_axis(columna).reset_index(name="FILAS")
+
+
+def pagina(df: pd.DataFrame, numero: int, tamano: int) -> pd.DataFrame:
+    """Filas de la página `numero` (desde 1)."""
+    inicio = (numero - 1) * tamano
+    return df.iloc[inicio:inicio + tamano]
+
+
+# ------------------------------------------------------------------
+# Vista paginada
+# ------------------------------------------------------------------
+def _memo_tabla(engine, clave: tuple, df: pd.DataFrame, construir):
+    """
+    `engine.memo` de un cálculo sobre `df`, con la identidad de `df` en la
+    clave. El valor guarda también `df`, de modo que mientras la entrada
+    exista su `id` no se reutiliza para otro resultado.
+    """
+    return engine.memo((*clave, id(df)), lambda: (df, construir()))[1]
+
+
+def tabla_paginada(engine, df: pd.DataFrame, clave, key: str) -> pd.DataFrame:
+    """
+    Muestra `df` (resultado de la consulta identificada por `clave`) con
+    filtros, totales, orden y paginación. `key` distingue los widgets de cada
+    tabla de la página. Retorna el resultado filtrado y ordenado completo.
+    """
+    resumen_cols = [c for c in RESUMEN_COLS if c in df.columns]
+
+    # --- Filtros ---
+    columnas = st.columns(len(resumen_cols) + 1)
+    filtros = {}
+    for col, columna in zip(resumen_cols, columnas):
+        opciones = _memo_tabla(engine, ("tabla_opciones", clave, col), df,
+                               lambda col=col: resumen(df, col)[col].tolist())
+        filtros[col] = columna.multiselect(col, opciones, key=f"{key}_filtro_{col}", placeholder="Todos")
+    serie = ""
+    if "SERIE" in df.columns:
+        serie = columnas[-1].text_input("SERIE comienza con", key=f"{key}_serie").strip().replace(",", "")
+
+    # --- Orden ---
+    col_orden, col_desc, col_tamano, col_pagina = st.columns([3, 2, 2, 2])
+    orden = col_orden.selectbox("Ordenar por", [SIN_ORDEN] + list(df.columns), key=f"{key}_orden")
+    orden = None if orden == SIN_ORDEN else orden
+    descendente = col_desc.toggle("Descendente", key=f"{key}_desc")
+
+    vista_clave = (clave, tuple((c, tuple(v)) for c, v in filtros.items()), serie, orden, descendente)
+    with medir("query", "tabla", filas=len(df)) as info:
+        vista = _memo_tabla(engine, ("tabla", vista_clave), df,
+                            lambda: ordenar(filtrar(df, filtros, serie), orden, descendente))
+        info["filas"] = len(vista)
+
+    # --- Totales ---
+    if resumen_cols:
+        columnas = st.columns(len(resumen_cols))
+        for col, columna in zip(resumen_cols, columnas):
+            totales = _memo_tabla(engine, ("tabla_resumen", vista_clave, col), df,
+                                  lambda col=col: resumen(vista, col))
+            columna.dataframe(totales.head(TOP), hide_index=True)
+            if len(totales) > TOP:
+                columna.caption(f"{len(totales):,} valores distintos")
+
+    # --- Página visible ---
+    tamano = col_tamano.selectbox("Filas por página", TAMANOS, index=1, key=f"{key}_tamano")
+    paginas = max(1, math.ceil(len(vista) / tamano))
+    clave_pagina = f"{key}_pagina"
+    if st.session_state.get(clave_pagina, 1) > paginas:
+        st.session_state[clave_pagina] = paginas
+    numero = col_pagina.number_input("Página", min_value=1, max_value=paginas, step=1, key=clave_pagina)
+
+    visible = pagina(vista, int(numero), tamano)
+    with medir("render", filas=len(visible)):
+        st.dataframe(visible, hide_index=True)
+    if len(vista):
+        inicio = (int(numero) - 1) * tamano
+        st.caption(f"Página {int(numero):,} de {paginas:,} · filas {inicio + 1:,}–{inicio + len(visible):,}"
+                   f" de {len(vista):,}" + (f" (filtradas de {len(df):,})" if len(vista) != len(df) else ""))
+    else:
+        st.caption("Ninguna fila coincide con los filtros.")
+    return vista
+
+
+# ------------------------------------------------------------------
+# Descargas
+# ------------------------------------------------------------------
+def _exportar(df: pd.DataFrame, formato: str, nombre: str) -> bytes:
+    registro = tiempos.iniciar(f"descarga {nombre}")
+    try:
+        with medir("export", formato, filas=len(df)), exportar(df, formato) as archivo:
+            return archivo.read()
+    finally:
+        registro.cerrar()
+
+
+def _generar(df: pd.DataFrame, formato: str, nombre: str) -> bytes:
+    """
+    Genera el archivo de una descarga con su propio registro de tiempos (la
+    etapa `export`). Streamlit lo llama fuera de la ejecución de la página,
+    así que el registro se abre en un contexto aparte y no reemplaza al de
+    la página si hubiera uno abierto.
+    """
+    return contextvars.Context().run(_exportar, df, formato, nombre)
+
+
+def botones_descarga(df: pd.DataFrame, nombre: str, key: str) -> None:
+    """
+    Un botón por formato de `DESCARGAS`. Streamlit ejecuta la exportación en
+    otro hilo sólo al hacer clic, así las ejecuciones de la página no pagan
+    por archivos que nadie descarga.
+    """
+    for (formato, etiqueta), columna in zip(DESCARGAS.items(), st.columns(len(DESCARGAS))):
+        columna.download_button(
+            f"⬇️ {etiqueta} (.{formato})",
+            data=partial(_generar, df, formato, nombre),
+            file_name=f"{nombre}.{formato}",
+            mime=FORMATOS[formato],
+            key=f"{key}_descarga_{formato}",
+            on_click="ignore",
+        )
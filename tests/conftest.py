@@ -0,0 +1,53 @@
+# tests/conftest.py
+"""
+Fixtures comunes: una flota sintética en el spreadsheet en memoria de
+`bench/gspread_local.py` y la comparación de un motor sincronizado de forma
+incremental con uno que descarga todo de nuevo.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+from bench import flota  # noqa: E402
+from bench.gspread_local import Spreadsheet  # noqa: E402
+from sync import SyncEngine  # noqa: E402
+
+DIMENSIONES = ("CLIENTE", "UBICACION", "SERVICIO")
+
+
+@pytest.fixture
+def spreadsheet() -> Spreadsheet:
+    return Spreadsheet(flota.generar(3000, seed=1), title="TEST TRAZABILIDAD")
+
+
+def motor(spreadsheet: Spreadsheet, cache_dir: Path | None = None) -> SyncEngine:
+    """Motor sin reconciliación periódica: sólo sincroniza completo si hace falta."""
+    return SyncEngine(spreadsheet, cache_dir=cache_dir, full_every=float("inf"))
+
+
+def completo(spreadsheet: Spreadsheet) -> SyncEngine:
+    """Motor nuevo con la hoja descargada completa (la referencia)."""
+    engine = motor(spreadsheet)
+    engine.sync(force_full=True)
+    return engine
+
+
+def _ordenado(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def assert_iguales(engine: SyncEngine, referencia: SyncEngine) -> None:
+    """Mismos movimientos, estado actual y resúmenes que la referencia."""
+    pd.testing.assert_frame_equal(engine.movimientos, referencia.movimientos, check_dtype=False,
+                                  check_categorical=False)
+    pd.testing.assert_frame_equal(db.estado_actual(engine.db), db.estado_actual(referencia.db))
+    for dimension in DIMENSIONES:
+        pd.testing.assert_frame_equal(_ordenado(db.resumen_estado(engine.db, dimension)),
+                                      _ordenado(db.resumen_estado(referencia.db, dimension)))
+    pd.testing.assert_frame_equal(db.movimientos_por_dia(engine.db, "0000"),
+                                  db.movimientos_por_dia(referencia.db, "0000"))
@@ -0,0 +1,119 @@
+# tests/test_db.py
+"""Tablas de resumen de `db.py` mantenidas por diferencias contra un recálculo completo."""
+import pandas as pd
+import pytest
+
+import db
+from bench.run import _agregar_filas
+from conftest import DIMENSIONES, assert_iguales, completo, motor
+
+# Recálculo desde cero, con las mismas reglas que `db.SUMAR_RESUMEN`
+RECALCULO = {
+    "CLIENTE": f"SELECT COALESCE(CLIENTE, '') AS VALOR, COUNT(*) AS CILINDROS FROM estado "
+               f"WHERE PROCESO IN {db.ENTREGAS} GROUP BY 1",
+    "UBICACION": "SELECT COALESCE(UBICACION, '') AS VALOR, COUNT(*) AS CILINDROS FROM estado GROUP BY 1",
+    "SERVICIO": "SELECT COALESCE(SERVICIO, '') AS VALOR, COUNT(*) AS CILINDROS FROM estado GROUP BY 1",
+}
+MOVIMIENTOS_DIA = """
+SELECT p.FECHA, COALESCE(p.PROCESO, '') AS PROCESO, COUNT(*) AS MOVIMIENTOS
+FROM detalle d JOIN proceso p ON p.IDPROC = d.IDPROC
+WHERE p.FECHA IS NOT NULL AND d.ANOMALA = 0
+GROUP BY 1, 2
+ORDER BY 1, 2
+"""
+
+
+def assert_resumenes_recalculados(base: db.MovementDB) -> None:
+    for dimension in DIMENSIONES:
+        resumen = db.resumen_estado(base, dimension).rename(columns={dimension: "VALOR"})
+        recalculo = base.query(RECALCULO[dimension])
+        pd.testing.assert_frame_equal(
+            resumen.sort_values("VALOR").reset_index(drop=True),
+            recalculo.sort_values("VALOR").reset_index(drop=True),
+            check_dtype=False,
+        )
+    # Sin filas en cero que queden de restar
+    assert base.query("SELECT COUNT(*) AS N FROM resumen_estado WHERE CILINDROS <= 0")["N"].item() == 0
+    pd.testing.assert_frame_equal(db.movimientos_por_dia(base, "0000"), base.query(MOVIMIENTOS_DIA))
+
+
+class Planilla:
+    """Agrega movimientos a las hojas del spreadsheet en memoria."""
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.proceso = spreadsheet.worksheet("PROCESO").values
+        self.detalle = spreadsheet.worksheet("DETALLE").values
+
+    def nuevo_idproc(self) -> str:
+        return str(max(int(f[0]) for f in self.proceso[1:]) + 1)
+
+    def series(self, n: int) -> list[str]:
+        return list(dict.fromkeys(f[1] for f in self.detalle[1:]))[:n]
+
+    def mover(self, series: list[str], proceso: str, cliente: str, ubicacion: str,
+              fecha: str = "01/01/2031", servicio: str = "OXIGENO", con_proceso: bool = True) -> str:
+        idproc = self.nuevo_idproc() if con_proceso else str(int(self.nuevo_idproc()) + 1000)
+        if con_proceso:
+            self.proceso.append([idproc, fecha, "12:00:00", proceso, cliente, ubicacion])
+        self.detalle.extend([idproc, serie, servicio] for serie in series)
+        self.spreadsheet.tocar()
+        return idproc
+
+
+@pytest.fixture
+def planilla(spreadsheet) -> Planilla:
+    return Planilla(spreadsheet)
+
+
+def test_carga_completa(spreadsheet):
+    assert_resumenes_recalculados(completo(spreadsheet).db)
+
+
+def test_lotes_incrementales_igual_a_recalculo(spreadsheet, planilla):
+    engine = motor(spreadsheet)
+    engine.sync()
+    series = planilla.series(12)
+    lotes = [
+        # Filas nuevas comunes
+        lambda: _agregar_filas(spreadsheet, 40),
+        # Entregas a un cliente nuevo y traslado entre clientes y ubicaciones
+        lambda: planilla.mover(series[:6], "ENTREGA", "CLIENTE A", "BODEGA A"),
+        lambda: planilla.mover(series[:3], "DESPACHO", "CLIENTE B", "BODEGA B", fecha="02/01/2031"),
+        # Retorno a planta: deja de contar para el cliente, cambia de ubicación
+        lambda: planilla.mover(series[3:6], "RECEPCION", "", "PLANTA", fecha="03/01/2031"),
+        # Movimiento con fecha anterior: no cambia el estado pero sí los movimientos por día
+        lambda: planilla.mover(series[6:9], "ENTREGA", "CLIENTE C", "BODEGA C", fecha="01/01/2000"),
+        # Cambio de SERVICIO
+        lambda: planilla.mover(series[9:], "ENTREGA", "CLIENTE A", "BODEGA A", servicio="ARGON",
+                               fecha="04/01/2031"),
+    ]
+    for lote in lotes:
+        lote()
+        engine.sync()
+        assert_resumenes_recalculados(engine.db)
+        assert_iguales(engine, completo(spreadsheet))
+
+    cliente = db.resumen_estado(engine.db, "CLIENTE").set_index("CLIENTE")["CILINDROS"]
+    assert cliente["CLIENTE B"] == 3 and cliente["CLIENTE A"] >= 3
+    assert "CLIENTE C" not in cliente.index
+
+
+def test_proceso_que_llega_despues_de_su_detalle(spreadsheet, planilla):
+    engine = motor(spreadsheet)
+    engine.sync()
+    series = planilla.series(4)
+
+    # DETALLE sin PROCESO: la SERIE queda con un movimiento sin fecha
+    idproc = planilla.mover(series, "ENTREGA", "CLIENTE D", "BODEGA D", con_proceso=False)
+    engine.sync()
+    assert_resumenes_recalculados(engine.db)
+
+    # Llega el PROCESO: se suma a movimientos por día y mueve las SERIE al cliente
+    planilla.proceso.append([idproc, "05/01/2031", "08:00:00", "ENTREGA", "CLIENTE D", "BODEGA D"])
+    spreadsheet.tocar()
+    engine.sync()
+    assert_resumenes_recalculados(engine.db)
+    assert_iguales(engine, completo(spreadsheet))
+    cliente = db.resumen_estado(engine.db, "CLIENTE").set_index("CLIENTE")["CILINDROS"]
+    assert cliente["CLIENTE D"] == 4
@@ -0,0 +1,165 @@
+# tests/test_sync.py
+"""Sincronización incremental de `sync.py` contra el spreadsheet en memoria."""
+import json
+
+import db
+import rotacion
+from bench.gspread_local import Spreadsheet
+from bench.run import _agregar_filas
+from conftest import assert_iguales, completo, motor
+from sync import SOLAPE
+
+
+def test_incremental_igual_a_completa(spreadsheet):
+    engine = motor(spreadsheet)
+    engine.sync()
+    for n in (1, 50, 400):
+        _agregar_filas(spreadsheet, n)
+        antes, version = len(engine.movimientos), engine.version
+        engine.sync()
+        assert len(engine.movimientos) == antes + n
+        assert engine.version == version + 1
+        assert_iguales(engine, completo(spreadsheet))
+
+
+def test_incremental_pide_solo_la_cola(spreadsheet):
+    engine = motor(spreadsheet)
+    engine.sync()
+    _agregar_filas(spreadsheet, 10)
+    antes = spreadsheet.requests
+    engine.sync()
+    # Fecha de modificación y un único batchGet con las filas nuevas (más el solape)
+    assert spreadsheet.requests - antes == 2
+    assert engine.detalle.last_row == len(spreadsheet.worksheet("DETALLE").values)
+
+
+def test_sin_cambios_no_descarga(spreadsheet):
+    engine = motor(spreadsheet)
+    engine.sync()
+    version, antes = engine.version, spreadsheet.requests
+    engine.sync()
+    assert spreadsheet.requests - antes == 1  # sólo la fecha de modificación
+    assert engine.version == version
+
+
+def test_hojas_sin_filas(spreadsheet):
+    hojas = {ws.title: ws.values for ws in spreadsheet.worksheets()}
+    vacia = Spreadsheet({titulo: valores[:1] for titulo, valores in hojas.items()})
+    engine = motor(vacia)
+    engine.sync()
+    assert list(engine.entregas.columns) == [
+        "SERIE", "IDPROC", "PROCESO", "CLIENTE", "UBICACION", "SERVICIO", "FECHA_ENTREGA", "FECHA_RETORNO"]
+    assert list(engine.viajes.columns) == rotacion.VIAJE_COLS
+    assert engine.entregas.empty and engine.viajes.empty and engine.anomalias.empty
+
+    # Las primeras filas llegan como en cualquier otra sincronización
+    for titulo, valores in hojas.items():
+        vacia.worksheet(titulo).append_rows(valores[1:])
+    vacia.tocar()
+    engine.sync()
+    assert_iguales(engine, completo(spreadsheet))
+    assert not engine.viajes.empty
+
+
+def test_detalle_huerfano_resuelto_por_proceso_posterior(spreadsheet):
+    proceso, detalle = spreadsheet.worksheet("PROCESO").values, spreadsheet.worksheet("DETALLE").values
+    engine = motor(spreadsheet)
+    engine.sync()
+
+    nuevo = str(int(proceso[-1][0]) + 1)
+    serie = engine.detalle.frame["SERIE"].iloc[5]
+    detalle.append([nuevo, detalle[6][1], "ARGON"])
+    spreadsheet.tocar()
+    engine.sync()
+    fila = engine.movimientos.iloc[-1]
+    assert str(fila["IDPROC"]) == nuevo and fila.isna()["CLIENTE"]
+    assert len(engine._huerfanas) == 1
+    assert_iguales(engine, completo(spreadsheet))
+
+    proceso.append([nuevo, "01/01/2030", "10:00:00", "ENTREGA", "CLIENTE NUEVO", "CLIENTE NUEVO"])
+    spreadsheet.tocar()
+    engine.sync()
+    assert engine.movimientos.iloc[-1]["CLIENTE"] == "CLIENTE NUEVO"
+    assert db.estado_actual(engine.db).set_index("SERIE").loc[serie, "CLIENTE"] == "CLIENTE NUEVO"
+    assert len(engine._huerfanas) == 0
+    assert_iguales(engine, completo(spreadsheet))
+
+
+def test_edicion_en_la_cola_fuerza_descarga_completa(spreadsheet):
+    detalle = spreadsheet.worksheet("DETALLE").values
+    engine = motor(spreadsheet)
+    engine.sync()
+
+    # Edición dentro de las últimas `SOLAPE` filas ya sincronizadas, más una fila nueva
+    detalle[-SOLAPE // 2][2] = "XENON"
+    _agregar_filas(spreadsheet, 3)
+    completa = engine.detalle.last_full
+    engine.sync()
+    assert engine.detalle.last_full > completa
+    assert (engine.movimientos["SERVICIO"] == "XENON").sum() == 1
+    assert_iguales(engine, completo(spreadsheet))
+
+
+def test_borrado_en_la_cola_fuerza_descarga_completa(spreadsheet):
+    detalle = spreadsheet.worksheet("DETALLE").values
+    engine = motor(spreadsheet)
+    engine.sync()
+
+    del detalle[-2:]
+    spreadsheet.tocar()
+    engine.sync()
+    assert len(engine.detalle.frame) == len(detalle) - 1
+    assert_iguales(engine, completo(spreadsheet))
+
+
+def test_copia_en_disco_sobrevive_reinicio(spreadsheet, tmp_path):
+    engine = motor(spreadsheet, tmp_path)
+    engine.sync()
+    _agregar_filas(spreadsheet, 30)
+    engine.sync()
+
+    antes = spreadsheet.requests
+    reiniciado = motor(spreadsheet, tmp_path)
+    assert spreadsheet.requests == antes  # se carga sin pedir nada
+    assert_iguales(reiniciado, engine)
+
+    # Después del reinicio la sincronización sigue siendo incremental
+    _agregar_filas(spreadsheet, 20)
+    reiniciado.sync()
+    assert reiniciado.detalle.last_full == engine.detalle.last_full
+    assert_iguales(reiniciado, completo(spreadsheet))
+
+
+def test_copia_en_disco_truncada_se_descarta(spreadsheet, tmp_path):
+    engine = motor(spreadsheet, tmp_path)
+    engine.sync()
+    filas = tmp_path / "DETALLE.rows.jsonl"
+    lineas = filas.read_text(encoding="utf-8").splitlines(keepends=True)
+    filas.write_text("".join(lineas[:-5]), encoding="utf-8")
+    assert json.loads((tmp_path / "DETALLE.meta.json").read_text())["n_rows"] == len(lineas)
+
+    reiniciado = motor(spreadsheet, tmp_path)
+    assert reiniciado.detalle.frame.empty and not reiniciado.detalle.header
+    reiniciado.sync()
+    assert_iguales(reiniciado, completo(spreadsheet))
+
+
+def test_descarga_completa_fuera_del_lock(spreadsheet, monkeypatch):
+    engine = motor(spreadsheet)
+    engine.sync()
+    anterior, movimientos = engine.db, engine.movimientos
+    bloqueado = []
+    load = db.MovementDB.load
+
+    def load_vigilado(self, *args):
+        bloqueado.append(engine._lock.locked())
+        load(self, *args)
+
+    monkeypatch.setattr(db.MovementDB, "load", load_vigilado)
+    _agregar_filas(spreadsheet, 5)
+    engine.sync(force_full=True)
+    # La base nueva se carga sin bloquear las consultas y después se reemplaza
+    assert bloqueado == [False]
+    assert engine.db is not anterior and engine.movimientos is not movimientos
+    assert len(db.estado_actual(anterior)) == len(db.estado_actual(engine.db))
+    assert_iguales(engine, completo(spreadsheet))
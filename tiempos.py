@@ -0,0 +1,173 @@
+# tiempos.py
+"""
+Medición de tiempos por etapa de cada ejecución de una página.
+
+Cada página abre un `Registro` al comenzar (`iniciar`) y lo cierra al final
+(`Registro.cerrar`). Entremedio, los módulos marcan sus etapas con `medir`
+(o el decorador `medido`):
+
+    connect    credenciales y apertura del spreadsheet
+    probe      fecha de modificación del spreadsheet (¿hay cambios?)
+    fetch      descarga desde Google Sheets
+    parse      grilla cruda -> DataFrame
+    normalize  esquema tipado (`schema.py`)
+    merge      unión DETALLE + PROCESO
+    db         carga de la base embebida
+    index      estructuras derivadas (índices, entregas)
+    query      consultas de la página
+    render     envío de tablas al navegador
+    export     archivos de descarga
+
+El registro vive en una `ContextVar`, así cada sesión (un hilo por ejecución)
+mide sólo lo suyo y los módulos de datos no dependen de Streamlit; si no hay
+un registro abierto, `medir` no hace nada. Al cerrar, el registro se escribe
+como una línea JSON en el logger `fastrack.tiempos`.
+
+Con `perfilar=True` la ejecución completa corre además bajo `cProfile`.
+"""
+import cProfile
+import io
+import json
+import logging
+import logging.handlers
+import marshal
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+log = logging.getLogger("fastrack.tiempos")
+
+# Tamaño máximo del archivo de registros antes de rotarlo, y copias anteriores que se conservan
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_COPIAS = 3
+
+_registro: ContextVar["Registro | None"] = ContextVar("registro_tiempos", default=None)
+
+
+class Registro:
+    """Etapas medidas durante una ejecución de una página."""
+
+    def __init__(self, pagina: str, perfilar: bool = False):
+        self.pagina = pagina
+        self.etapas: list[dict] = []
+        self.total: float | None = None
+        self._inicio = time.perf_counter()
+        self._nivel = 0
+        self.perfil = cProfile.Profile() if perfilar else None
+        if self.perfil is not None:
+            self.perfil.enable()
+
+    def cerrar(self, **extra) -> dict:
+        """Termina la medición y escribe el registro en el log (una sola vez)."""
+        if self.total is None:
+            self.total = time.perf_counter() - self._inicio
+            if self.perfil is not None:
+                self.perfil.disable()
+            if _registro.get() is self:
+                _registro.set(None)
+            log.info(json.dumps(self.como_dict(**extra), ensure_ascii=False, default=str))
+        return self.como_dict(**extra)
+
+    def como_dict(self, **extra) -> dict:
+        return {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "pagina": self.pagina,
+            "total": round(self.total if self.total is not None else time.perf_counter() - self._inicio, 6),
+            "etapas": self.etapas,
+            **extra,
+        }
+
+    def perfil_texto(self, n: int = 30) -> str:
+        """Las `n` funciones con más tiempo acumulado (si se perfiló)."""
+        if self.perfil is None:
+            return ""
+        salida = io.StringIO()
+        pstats.Stats(self.perfil, stream=salida).sort_stats("cumulative").print_stats(n)
+        return salida.getvalue()
+
+    def perfil_bytes(self) -> bytes:
+        """Estadísticas de cProfile en formato `.prof` (para snakeviz, etc.)."""
+        if self.perfil is None:
+            return b""
+        return marshal.dumps(pstats.Stats(self.perfil).stats)
+
+
+def iniciar(pagina: str, perfilar: bool = False) -> Registro:
+    """Abre el registro de la ejecución actual (reemplaza uno anterior sin cerrar)."""
+    registro = Registro(pagina, perfilar)
+    _registro.set(registro)
+    return registro
+
+
+def actual() -> Registro | None:
+    return _registro.get()
+
+
+@contextmanager
+def medir(etapa: str, detalle: str = "", filas: int | None = None):
+    """
+    Mide el bloque como `etapa`. Se puede informar la cantidad de filas
+    asignando `info["filas"]` dentro del bloque.
+    """
+    registro = _registro.get()
+    info = {"filas": filas}
+    if registro is None:
+        yield info
+        return
+    registro._nivel += 1
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        registro._nivel -= 1
+        registro.etapas.append({
+            "inicio": round(t0 - registro._inicio, 6),
+            "etapa": etapa,
+            "detalle": detalle,
+            "segundos": round(time.perf_counter() - t0, 6),
+            "filas": info["filas"],
+            "nivel": registro._nivel,
+        })
+
+
+def _filas(resultado) -> int | None:
+    if isinstance(resultado, tuple) and resultado:
+        resultado = resultado[0]
+    try:
+        return len(resultado)
+    except TypeError:
+        return None
+
+
+def medido(etapa: str):
+    """Decorador: mide cada llamada como `etapa` (detalle = nombre de la función)."""
+    def decorador(fn):
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            with medir(etapa, fn.__name__) as info:
+                resultado = fn(*args, **kwargs)
+                info["filas"] = _filas(resultado)
+            return resultado
+        return envoltura
+    return decorador
+
+
+def configurar_log(path: Path) -> None:
+    """
+    Escribe los registros de tiempos como JSON Lines en `path` (idempotente).
+    Al superar `LOG_MAX_BYTES` el archivo se rota (`path.1`, `path.2`, ...).
+    """
+    path = Path(path)
+    if any(getattr(h, "baseFilename", None) == str(path.resolve()) for h in log.handlers):
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_COPIAS, encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
@@ -0,0 +1,129 @@
+# validacion.py
+"""
+Validación de la secuencia de movimientos de cada cilindro.
+
+Las páginas confían en el registro tal como viene de la planilla. Esta etapa
+revisa, una vez por versión de los datos (ver `MovementData.anomalias`), tres
+tipos de problema:
+
+- transiciones imposibles: cada SERIE se recorre en orden cronológico y cada
+  movimiento se compara con el anterior según `TRANSICIONES` (por ejemplo, un
+  DESPACHO o ENTREGA cuando el cilindro ya estaba fuera y no retornó, o un
+  retorno cuando ya estaba en planta). También se marcan los PROCESO que no
+  son parte del flujo;
+- filas de DETALLE huérfanas: su IDPROC no existe en PROCESO, así que la
+  unión deja FECHA, PROCESO y CLIENTE vacíos;
+- PROCESO con FECHA vacía o que no se pudo leer como dd/mm/aaaa.
+
+Todo se hace con una sola ordenación y comparaciones vectorizadas con la fila
+anterior, al sincronizar (ver `SyncEngine._merge`). `validar` entrega además
+qué movimientos excluir: los de transiciones imposibles y PROCESO fuera del
+flujo no cuentan para las entregas, los viajes, el estado actual ni los
+resúmenes (ver `sync.EXCLUIR_ANOMALIAS`). Las filas huérfanas y sin FECHA ya
+quedan fuera por no tener FECHA_HORA. La tabla de anomalías explica qué
+revisar en la planilla.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from schema import con_fecha_y_hora, fecha_hora
+
+# Flujo de un cilindro: DESPACHO -> ENTREGA -> RETIRO -> RECEPCION -> DESPACHO...
+# Para cada PROCESO, los que pueden venir a continuación. Se permite saltar un
+# paso (p. ej. ENTREGA directa desde planta, o RETIRO sin RECEPCION).
+TRANSICIONES = {
+    "DESPACHO": {"ENTREGA", "RETIRO", "RECEPCION"},
+    "ENTREGA": {"RETIRO", "RECEPCION"},
+    "RETIRO": {"RECEPCION", "DESPACHO", "ENTREGA"},
+    "RECEPCION": {"DESPACHO", "ENTREGA"},
+}
+SALIDAS = {"DESPACHO", "ENTREGA"}
+
+# Tipos de anomalía
+SALIDA_DOBLE = "Salida sin retorno previo"
+RETORNO_DOBLE = "Retorno sin salida previa"
+PROCESO_DESCONOCIDO = "PROCESO fuera del flujo"
+HUERFANA = "DETALLE sin PROCESO"
+FECHA_INVALIDA = "FECHA vacía o inválida"
+TIPOS = (SALIDA_DOBLE, RETORNO_DOBLE, PROCESO_DESCONOCIDO, HUERFANA, FECHA_INVALIDA)
+
+ANOMALIA_COLS = [
+    "TIPO", "SERIE", "IDPROC", "FECHA", "HORA", "PROCESO", "CLIENTE", "UBICACION",
+    "PROCESO_ANTERIOR", "IDPROC_ANTERIOR",
+]
+
+_PROCESOS = list(TRANSICIONES)
+# _PERMITIDA[anterior, actual] con los PROCESO del flujo como índices
+_PERMITIDA = np.array([[b in TRANSICIONES[a] for b in _PROCESOS] for a in _PROCESOS])
+
+
+def _transiciones(mov: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Movimientos cuya transición desde el anterior de la misma SERIE no está
+    permitida o cuyo PROCESO no es del flujo, y sus posiciones en `mov`.
+    """
+    ts = fecha_hora(mov)
+    proceso = mov["PROCESO"].astype(object)
+    codigo = pd.Index(_PROCESOS).get_indexer(proceso)
+    valido = ts.notna().to_numpy() & mov["SERIE"].notna().to_numpy() & proceso.notna().to_numpy()
+    pos = np.flatnonzero(valido)
+    serie = pd.factorize(mov["SERIE"].to_numpy()[pos])[0]
+    orden = np.lexsort((pos, ts.to_numpy()[pos], serie))
+    pos, serie, codigo = pos[orden], serie[orden], codigo[pos][orden]
+
+    desconocido = codigo < 0
+    # Sólo los PROCESO del flujo forman la secuencia
+    conocidos = ~desconocido
+    pos_f, serie_f, codigo_f = pos[conocidos], serie[conocidos], codigo[conocidos]
+    con_anterior = np.zeros(len(pos_f), dtype=bool)
+    con_anterior[1:] = serie_f[1:] == serie_f[:-1]
+    anterior = np.roll(codigo_f, 1)
+    invalida = con_anterior & ~_PERMITIDA[anterior, codigo_f]
+
+    i = np.flatnonzero(invalida)
+    salida = np.isin(np.asarray(_PROCESOS)[codigo_f[i]], list(SALIDAS))
+    transiciones = mov.iloc[pos_f[i]].assign(
+        TIPO=np.where(salida, SALIDA_DOBLE, RETORNO_DOBLE),
+        PROCESO_ANTERIOR=np.asarray(_PROCESOS)[codigo_f[i - 1]],
+        IDPROC_ANTERIOR=mov["IDPROC"].iloc[pos_f[i - 1]].to_numpy(dtype=object),
+    )
+    desconocidos = mov.iloc[pos[desconocido]].assign(TIPO=PROCESO_DESCONOCIDO)
+    return pd.concat([transiciones, desconocidos]), np.concatenate([pos_f[i], pos[desconocido]])
+
+
+def validar(df_proceso: pd.DataFrame, df_movimientos: pd.DataFrame) -> SimpleNamespace:
+    """
+    `anomalias`: la tabla de anomalías (una fila por movimiento o PROCESO
+    marcado), por TIPO y FECHA. `excluidos`: para cada fila de
+    `df_movimientos`, si su transición es imposible o su PROCESO no es del flujo.
+    """
+    partes = []
+    mov = df_movimientos
+    excluidos = np.zeros(len(mov), dtype=bool)
+    if not mov.empty and {"SERIE", "PROCESO"} <= set(mov.columns):
+        transiciones, posiciones = _transiciones(mov)
+        partes.append(transiciones)
+        excluidos[posiciones] = True
+    if not mov.empty and "IDPROC" in df_proceso.columns:
+        huerfanas = ~mov["IDPROC"].isin(df_proceso["IDPROC"])
+        partes.append(mov[huerfanas.to_numpy()].assign(TIPO=HUERFANA))
+    if not df_proceso.empty and "FECHA_HORA" in df_proceso.columns:
+        sin_fecha = df_proceso["FECHA_HORA"].isna()
+        partes.append(df_proceso[sin_fecha.to_numpy()].assign(TIPO=FECHA_INVALIDA))
+    if not partes:
+        return SimpleNamespace(anomalias=pd.DataFrame(columns=ANOMALIA_COLS), excluidos=excluidos)
+
+    df = pd.concat([p.astype({c: object for c in p.columns if c != "FECHA_HORA"}) for p in partes],
+                   ignore_index=True)
+    df["TIPO"] = pd.Categorical(df["TIPO"], categories=TIPOS)
+    df = df.sort_values(["TIPO", "FECHA_HORA"], na_position="first", kind="stable")
+    df = con_fecha_y_hora(df)
+    return SimpleNamespace(anomalias=df.reindex(columns=ANOMALIA_COLS).reset_index(drop=True),
+                           excluidos=excluidos)
+
+
+def anomalias(df_proceso: pd.DataFrame, df_movimientos: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de anomalías de `validar`."""
+    return validar(df_proceso, df_movimientos).anomalias